@@ -0,0 +1,61 @@
+"""
+Queue body encode/decode: stdlib json (the previous hot path) vs libs.serializer
+
+Uses representative queue messages: a single OTP SMS, a single HTML email and a 1000-recipient
+bulk email.
+
+    pip install orjson          # or msgspec; without either the stdlib fallback is measured
+    python -m benchmarks.serializer_benchmark --number 20000
+"""
+import argparse, json, logging, timeit
+from src.utils.libs import serializer
+
+
+def messages() -> dict:
+    html = "<html><body>" + "<p>Your statement for this month is ready. Thank you for banking with us.</p>" * 30 + "</body></html>"
+    return {
+        "sms": {
+            "type": "sms",
+            "priority_class": "otp",
+            "payload": {"phone_number": "+2348012345678", "message": {"response": "Your OTP is 482913. It expires in 5 minutes."}, "realm": "smpp"},
+        },
+        "email": {
+            "type": "email",
+            "payload": {"to_email": "customer@example.com", "subject": "Your monthly statement", "body": "Your statement is ready.", "html_body": html, "provider": "smtp"},
+        },
+        "bulk email": {
+            "type": "email",
+            "isBulk": True,
+            "payload": {"recipients": [f"customer{i}@example.com" for i in range(1000)], "subject": "Service update", "body": "We are upgrading our systems tonight.", "provider": "erp"},
+        },
+    }
+
+
+def measure(number: int, statement) -> float:
+    """Best of 5 runs, in microseconds per call"""
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="calls per timing run")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"serializer backend: {serializer.BACKEND}")
+    print(f"{'message':<12}{'bytes':>8}  {'op':<16}{'stdlib us':>11}{'serializer us':>15}{'speedup':>9}")
+    for name, body in messages().items():
+        raw = json.dumps(body).encode()
+        number = max(args.number // max(len(raw) // 1000, 1), 100)
+        rows = [
+            ("encode", lambda: json.dumps(body).encode(), lambda: serializer.dumps(body)),
+            ("decode", lambda: json.loads(raw.decode()), lambda: serializer.loads(raw)),
+        ]
+        for op, baseline, candidate in rows:
+            before = measure(number, baseline)
+            after = measure(number, candidate)
+            print(f"{name:<12}{len(raw):>8}  {op:<16}{before:>11.2f}{after:>15.2f}{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
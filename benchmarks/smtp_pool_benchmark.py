@@ -0,0 +1,101 @@
+"""
+SMTP send throughput: one aiosmtplib.send() per message vs the pooled SMTPConnectionPool
+
+Runs a local aiosmtpd sink as the SMTP server stand-in. --rtt-ms adds a delay to every SMTP
+command (EHLO/MAIL/RCPT/DATA) to approximate the network round trips to a real relay.
+
+    pip install aiosmtpd
+    python -m benchmarks.smtp_pool_benchmark --messages 2000 --rtt-ms 5
+"""
+import argparse, asyncio, logging, time
+from email.message import EmailMessage
+import aiosmtplib
+from aiosmtpd.controller import Controller
+from src.utils.libs.smtp_pool import SMTPConnectionPool
+from src.services.bulk_sender import BulkSender
+
+
+class LatencySink:
+    """aiosmtpd handler that accepts and drops everything after a simulated round trip"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.rtt)
+        session.host_name = hostname
+        return responses
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        await asyncio.sleep(self.rtt)
+        envelope.mail_from = address
+        return "250 OK"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        await asyncio.sleep(self.rtt)
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.rtt)
+        self.received += 1
+        return "250 Message accepted for delivery"
+
+
+def build_message(index: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "Benchmark <bench@example.com>"
+    msg["To"] = f"user{index}@example.com"
+    msg["Subject"] = "Benchmark"
+    msg.set_content("Hello from the SMTP pool benchmark")
+    return msg
+
+
+async def per_message(host: str, port: int, messages: int, concurrency: int) -> float:
+    """The previous behaviour: connect + EHLO + QUIT for every message, 50 at a time"""
+    sender = BulkSender(concurrency=concurrency)
+    start = time.perf_counter()
+    await sender.run(
+        list(range(messages)),
+        lambda i: aiosmtplib.send(build_message(i), hostname=host, port=port, start_tls=False, timeout=30)
+    )
+    return time.perf_counter() - start
+
+
+async def pooled(host: str, port: int, messages: int, size: int, max_messages: int) -> float:
+    pool = SMTPConnectionPool(hostname=host, port=port, start_tls=False, size=size, max_messages=max_messages)
+    sender = BulkSender(concurrency=size)
+    start = time.perf_counter()
+    await sender.run(list(range(messages)), lambda i: pool.send_message(build_message(i)))
+    elapsed = time.perf_counter() - start
+    print(f"  pool stats: {pool.stats()}")
+    await pool.aclose()
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrency of the per-message baseline")
+    parser.add_argument("--pool-size", type=int, default=50)
+    parser.add_argument("--max-messages", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    handler = LatencySink(args.rtt_ms / 1000)
+    controller = Controller(handler, hostname="127.0.0.1", port=8025)
+    controller.start()
+    try:
+        baseline = await per_message("127.0.0.1", 8025, args.messages, args.concurrency)
+        print(f"per-message send : {args.messages / baseline:8.1f} msgs/sec ({baseline:.2f}s)")
+        pool = await pooled("127.0.0.1", 8025, args.messages, args.pool_size, args.max_messages)
+        print(f"pooled sessions  : {args.messages / pool:8.1f} msgs/sec ({pool:.2f}s)")
+        print(f"speedup          : {baseline / pool:8.2f}x")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,3 @@
 from .config import *
-from .dbconfig import FastAPI, engine
-from .middleware import add_app_middlewares, add_exception_middleware, middlewares
+from .dbconfig import FastAPI, engine, async_session, init_db
 from fastapi_async_sqlalchemy import db
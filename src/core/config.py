@@ -2,7 +2,7 @@ import os, logging, asyncio
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from src.utils.libs import log_handler, logger
-from typing import Dict
+from typing import Dict, Literal
 
 logging.basicConfig(level=logging.DEBUG, handlers=[log_handler])
 baseDir = os.path.abspath(os.path.dirname(__file__))
@@ -36,6 +36,42 @@ class AppSettings(BaseSettings):
     rabbitmq_password: str
     rabbitmq_port: int
     queue_name: str
+    queue_prefetch_count: int = 25
+    queue_routes: Dict[str, str] = {}  # {"sms.otp": "notifications.sms.otp", "sms": "notifications.sms", "email": ...}; unrouted types use queue_name
+    queue_prefetch: Dict[str, int] = {}  # per-queue prefetch, defaults to queue_prefetch_count
+    queue_concurrency: Dict[str, int] = {}  # per-queue deliveries processed at once, defaults to the queue's prefetch
+    queue_max_priority: int = 0  # x-max-priority of the notification queues, 0 for plain FIFO queues (the broker rejects changing it on an existing queue)
+    queue_priority_classes: Dict[str, int] = {"otp": 10, "transactional": 5, "marketing": 0}  # priority of a message's priority_class
+    queue_urgent_priority: int = 5  # messages at or above this priority skip the batching window
+    queue_type: Literal["classic", "quorum"] = "classic"  # no streams: every consumer reads every message, so sends would repeat
+    queue_max_length: int = 0  # messages; 0 is unbounded
+    queue_max_length_bytes: int = 0  # 0 is unbounded
+    queue_overflow: Literal["reject-publish", "drop-head"] = "reject-publish"  # drop-head dead-letters the oldest message to the DLQ
+    queue_lazy_mode: bool = False  # classic queues only: keep the backlog on disk rather than in RAM
+    consumer_type_concurrency: Dict[str, int] = {}  # e.g. {"email": 10}; types not listed are only bounded by prefetch
+    consumer_drain_timeout: float = 30.0
+    queue_depth_poll_interval: float = 15.0  # seconds between queue depth samples for /metrics, 0 disables
+    queue_consumers_in_api: bool = True  # false when the consumers run in `python -m src.worker` instead
+    queue_broadcast_exchange: str = "notification_broadcast"  # fanout exchange reaching every API and worker process
+    worker_processes: int = 1  # consumer processes started by `python -m src.worker`
+    worker_metrics_port: int = 0  # worker process i serves /metrics on this port + i, 0 disables
+    worker_restart_backoff: float = 1.0  # seconds before restarting a dead worker, doubled on each consecutive death
+    worker_restart_backoff_max: float = 60.0  # ceiling of that delay; a worker up this long starts over at worker_restart_backoff
+    http_dispatch_mode: Literal["background", "queue"] = "background"  # queue: routers enqueue jobs for the consumers to send
+    job_chunk_size: int = 500  # recipients sent (and recorded in the job ledger) per step / per queue message
+    upload_max_recipients: int = 1_000_000  # per streamed /sms/bulk/upload or /email/bulk/upload
+    upload_buffered_chunks: int = 4  # parsed job_chunk_size chunks held while earlier ones are sent
+    upload_max_line_bytes: int = 4096  # longer NDJSON/CSV lines reject the upload
+    job_ledger_batch_size: int = 500  # buffered recipient results that trigger a ledger write
+    job_ledger_flush_interval: float = 1.0
+    job_ledger_insert_chunk_size: int = 5000
+    queue_max_retries: int = 3
+    queue_retry_delays: list[int] = [5, 30, 120]  # seconds per retry tier; the last tier repeats
+    queue_batching_enabled: bool = False  # aggregate single sends of the same type/provider/body into bulk calls
+    queue_batch_window_ms: int = 50
+    queue_batch_max_size: int = 100  # keep <= queue_prefetch_count, or batches only ever flush on the window
+    publish_channel_pool_size: int = 4  # confirm-mode channels used only for publishing
+    publish_max_unconfirmed: int = 1000  # publishes awaiting a broker confirm at once in send_many
 
     keycloak_realm: str
     keycloak_server_url: str
@@ -52,6 +88,10 @@ class AppSettings(BaseSettings):
     mail_ssl: bool = False
     use_credentials: bool = True
     validate_certs: bool = True
+    smtp_pool_size: int = 10
+    smtp_pool_max_messages: int = 100
+    smtp_pool_health_check_interval: float = 30.0
+    template_check_interval: float = 5.0
 
     grafana_webhook_secret: str
     grafana_email: str
@@ -67,11 +107,36 @@ class AppSettings(BaseSettings):
     odoo_headers: Dict = {
         'Content-Type': 'application/json'
     }
+    erp_mail_batch_size: int = 100
+    erp_max_concurrency: int = 10
+    erp_timeout: float = 120.0
+    erp_template_cache_size: int = 256
+    erp_template_cache_ttl: int = 600
+    template_cache_admin_key: str = ""  # x-api-key of DELETE /email/templates/cache; empty disables the endpoint
 
     pisi_url: str = "https://api.pisimobile.com/"
     pisi_header: Dict = {
         'Content-Type': 'application/json'
     }
+    pisi_vaspid: str = "3"
+    pisi_token_ttl: int = 3000
+    pisi_token_refresh_margin: int = 300
+
+    sms_http_max_connections: int = 100
+    sms_http_max_keepalive_connections: int = 20
+    sms_http_keepalive_expiry: float = 30.0
+    sms_http_timeout: float = 30.0
+    sms_http2_providers: list[str] = ["smpp", "pisi"]
+    sms_bulk_default_concurrency: int = 20
+    sms_bulk_concurrency: Dict[str, int] = {"smpp": 50, "pisi": 20, "coroperate": 20, "external": 20}
+    sms_bulk_rate: Dict[str, float] = {}  # msgs/sec per provider, unset or 0 = unthrottled
+    sms_default_country_code: str = "234"  # country of national-format numbers (0803…, 803…) when deduplicating
+    sms_national_number_digits: int = 10  # digits of a national number without its trunk 0
+
+    # Extra providers plugged in by name, e.g. {"twilio": "src.services.twilio_service.TwilioSMSProvider"}
+    sms_providers: Dict[str, str] = {}
+    email_providers: Dict[str, str] = {}
+    push_providers: Dict[str, str] = {}
 
     model_config = SettingsConfigDict(env_file=".conf") 
 
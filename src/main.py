@@ -1,9 +1,10 @@
 from contextlib import asynccontextmanager
-from src.routers import api_router, process_email_message, process_sms_message
-from src.core import (
-    FastAPI, add_app_middlewares, add_exception_middleware, settings, asyncio, middlewares, logging
-)
+from src.routers import api_router
+from src.core import FastAPI, settings, asyncio, logging, init_db
+from src.core.middleware import add_app_middlewares, add_exception_middleware, middlewares
 from src.services import EventHandler_Service
+from src.services.notification_runtime import start_services, start_consumers, start_broadcasts, stop_services
+from src.utils.helpers import SerializedJSONResponse
 
 eventrouter_handler = EventHandler_Service()
 
@@ -11,23 +12,21 @@ eventrouter_handler = EventHandler_Service()
 async def lifespan(app: FastAPI):
     await asyncio.gather(
         eventrouter_handler.connect_rabbitmq(app),
-        add_exception_middleware(app)
-    )
-    await asyncio.gather(
-        eventrouter_handler.register_handler('email', process_email_message, settings.queue_name ),
-        # eventrouter_handler.register_handler('push', process_push_message, settings.queue_name ),
-        eventrouter_handler.register_handler('sms', process_sms_message, settings.queue_name )
+        add_exception_middleware(app),
+        init_db()
     )
-    await eventrouter_handler.setup_consumers(app)
+    await start_services()
+    # With QUEUE_CONSUMERS_IN_API=false the API only publishes; `python -m src.worker` consumes
+    if settings.queue_consumers_in_api:
+        await start_consumers(eventrouter_handler, app)
+    await start_broadcasts(eventrouter_handler)
     app.state.eventrouter_handler = eventrouter_handler
     
     yield
     if hasattr(app.state, 'worker_task'):
         app.state.worker_task.cancel()
 
-    if hasattr(app.state, 'app.state.eventrouter_handler'):
-        await eventrouter_handler.stop_all()
-        await app.state.rabbit_connection.close()
+    await stop_services(eventrouter_handler if hasattr(app.state, 'eventrouter_handler') else None)
 
 app: FastAPI = FastAPI(
     debug = settings.debug,
@@ -38,6 +37,7 @@ app: FastAPI = FastAPI(
     middleware = middlewares,
     port = settings.port,
     redoc_url = None,
+    default_response_class = SerializedJSONResponse,
     lifespan = lifespan,
     servers=[{"url": f"/{settings.app_root}", "description": f"{settings.app_name} endpoints"}]
 )
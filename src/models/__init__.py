@@ -0,0 +1 @@
+from .job_model import NotificationJob, JobRecipient
@@ -0,0 +1,36 @@
+"""
+Job Models - durable ledger of HTTP-submitted notifications
+"""
+from datetime import datetime
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from src.core.dbconfig import Base
+
+
+class NotificationJob(Base):
+    """One /sms or /email submission, with running progress counters"""
+    __tablename__ = "notification_jobs"
+
+    id = Column(String(36), primary_key=True)
+    channel = Column(String(16), nullable=False)  # sms | email
+    provider = Column(String(32), nullable=False)
+    is_bulk = Column(Boolean, nullable=False, default=False)
+    status = Column(String(32), nullable=False, default="queued")  # queued | running | completed | completed_with_errors | failed
+    total = Column(Integer, nullable=False, default=0)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    duplicates = Column(Integer, nullable=False, default=0)  # submitted recipients dropped as repeats, not in total
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class JobRecipient(Base):
+    """Delivery result of one recipient of a job, addressed by its position in the submission"""
+    __tablename__ = "notification_job_recipients"
+
+    job_id = Column(String(36), ForeignKey("notification_jobs.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    recipient = Column(String(320), nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # pending | sent | failed
+    message_id = Column(String(255), nullable=True)
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
@@ -1,2 +1,3 @@
 from .email_repository import EmailRepository
-from .sms_repository import SMSRepository
\ No newline at end of file
+from .sms_repository import SMSRepository
+from .job_repository import JobRepository
\ No newline at end of file
@@ -4,6 +4,7 @@ import asyncio
 from src.services import (EmailServiceFactory)
 from src.core import (logging,settings)
 from src.utils.helpers.errors import BadRequestError, ServiceUnavailableError
+from src.utils.helpers.recipients import normalize_email, dedupe_recipients, expand_results
 
 
 class EmailRepository:
@@ -85,7 +86,7 @@ class EmailRepository:
             if not provider:
                 raise BadRequestError(
                     message="Email provider is required",
-                    verboseMessage="Provider field must be one of: smtp, erp"
+                    verboseMessage=f"Provider field must be one of: {self.factory.registry.names()}"
                 )
             
             # Validate email format
@@ -150,11 +151,14 @@ class EmailRepository:
             if not provider:
                 raise BadRequestError(
                     message="Email provider is required",
-                    verboseMessage="Provider field must be one of: smtp, erp"
+                    verboseMessage=f"Provider field must be one of: {self.factory.registry.names()}"
                 )
             
+            # Send each address once: domains are case-insensitive, local parts are not
+            unique, index_of = dedupe_recipients(recipients, normalize_email)
+
             # Validate all email addresses
-            invalid_emails = [email for email in recipients if not self._is_valid_email(email)]
+            invalid_emails = [email for email in unique if not self._is_valid_email(email)]
             if invalid_emails:
                 raise BadRequestError(
                     message="Invalid email addresses detected",
@@ -162,20 +166,21 @@ class EmailRepository:
                 )
             
             email_provider = self.factory.get_provider(provider)
-            results = await email_provider.send_bulk(recipients, subject, body, html_body)
+            results = await email_provider.send_bulk(unique, subject, body, html_body)
             
             # Calculate statistics
             successful = sum(1 for r in results if r.get("status") == "sent")
             failed = len(results) - successful
             
-            logging.info(f"Sending bulk emails to {len(recipients)} recipients via {provider} has successfully sent {successful} email of {len(results)}")
+            logging.info(f"Sending bulk emails to {len(unique)} recipients via {provider} has successfully sent {successful} email of {len(results)}, {len(recipients) - len(unique)} duplicates dropped")
             return {
                 "success": failed == 0,
                 "data": {
-                    "total": len(results),
+                    "total": len(recipients),
                     "successful": successful,
                     "failed": failed,
-                    "results": results,
+                    "duplicates_dropped": len(recipients) - len(unique),
+                    "results": expand_results(results, index_of),
                     "timestamp": datetime.utcnow().isoformat()
                 }
             }
@@ -194,6 +199,39 @@ class EmailRepository:
                 verboseMessage=str(e)
             )
     
+    async def invalidate_template_cache(self, template_id: Optional[str] = None, provider: str = "erp") -> Dict[str, Any]:
+        """
+        Drop cached ERP mail templates so the next send re-reads them
+        
+        Args:
+            template_id: Template to drop (all templates when omitted)
+            provider: Email provider owning the cache (erp)
+        
+        Returns:
+            Dictionary with the number of invalidated templates
+        """
+        try:
+            email_provider = self.factory.get_provider(provider)
+            if not hasattr(email_provider, "invalidate_templates"):
+                raise BadRequestError(
+                    message=f"Email provider {provider} has no template cache",
+                    verboseMessage="Template caching is only available for the erp provider"
+                )
+
+            invalidated = email_provider.invalidate_templates(template_id)
+            logging.info(f"Invalidated {invalidated} cached {provider} template(s)")
+            return {
+                "success": True,
+                "data": {"invalidated": invalidated}
+            }
+        except BadRequestError:
+            raise
+        except ValueError as ve:
+            raise BadRequestError(
+                message=f"Invalid email provider: {provider}",
+                verboseMessage=str(ve)
+            )
+    
     @staticmethod
     def _is_valid_email(email: str) -> bool:
         """Basic email validation"""
@@ -0,0 +1,297 @@
+"""
+Job Repository - Business logic for tracked (ledgered) notification jobs
+"""
+import asyncio
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from src.core import settings
+from src.services.job_ledger import job_ledger
+from src.utils.libs.logging import logging
+from src.utils.helpers.errors import BaseError, NotFoundError, ServiceUnavailableError
+from src.utils.helpers.recipients import drop_duplicates
+
+
+class JobRepository:
+    """Repository for notification jobs"""
+
+    def __init__(self):
+        self.ledger = job_ledger
+        self.dispatchers = set()  # upload dispatch tasks still sending
+
+    async def create_job(self, channel: str, provider: str, recipients: Sequence[str], is_bulk: bool = True,
+                         duplicates: int = 0) -> str:
+        """
+        Persist a job before any work is handed off
+
+        Args:
+            recipients: The recipients to send to, already deduplicated
+            duplicates: Submitted recipients dropped as repeats, reported by GET /jobs/{id}
+
+        Returns:
+            The job id to poll with GET /jobs/{id}
+        """
+        try:
+            return await self.ledger.create_job(
+                channel, str(getattr(provider, "value", provider)), list(recipients), is_bulk, duplicates
+            )
+        except Exception as e:
+            logging.error(f"Failed to create {channel} job: {str(e)}")
+            raise ServiceUnavailableError(
+                message="Failed to record notification job",
+                verboseMessage=str(e)
+            )
+
+    @staticmethod
+    def results_of(result: Dict[str, Any]) -> List[dict]:
+        """Per-recipient results from a repository send (single or bulk)"""
+        data = result.get("data", {})
+        return data["results"] if "results" in data else [data]
+
+    async def run_job(self, job_id: str, recipients: Sequence[str], send_chunk: Callable[[List[str]], Awaitable[Dict[str, Any]]]):
+        """
+        Send a job's recipients chunk by chunk, recording each chunk's results in the ledger
+
+        Args:
+            job_id: Job created with create_job
+            recipients: The job's recipients, in the order they were recorded
+            send_chunk: Sends a list of recipients and returns the repository result
+        """
+        recipients = list(recipients)
+        await self.ledger.mark_running(job_id)
+        for offset in range(0, len(recipients), settings.job_chunk_size):
+            await self.run_chunk(job_id, offset, recipients[offset:offset + settings.job_chunk_size], send_chunk)
+
+    async def run_chunk(self, job_id: str, offset: int, chunk: List[str], send_chunk: Callable[[List[str]], Awaitable[Dict[str, Any]]]):
+        """Send one chunk of a job's recipients and record the results; never raises"""
+        try:
+            results = self.results_of(await send_chunk(chunk))
+        except BaseError as e:
+            results = [{"status": "failed", "error": e.verboseMessage or e.message}] * len(chunk)
+        except Exception as e:
+            logging.error(f"Job {job_id} chunk at {offset} failed: {str(e)}")
+            results = [{"status": "failed", "error": str(e)}] * len(chunk)
+        self.ledger.record(job_id, offset, results)
+
+    @staticmethod
+    def queue_bodies(message_type: str, job_id: str, recipients: Sequence[str], recipients_key: str,
+                     payload: Dict[str, Any], priority: int = None, priority_class: str = None,
+                     offset: int = 0) -> List[dict]:
+        """Split a bulk job (or the part of it starting at `offset`) into queue messages of at most job_chunk_size recipients"""
+        recipients = list(recipients)
+        return [
+            {
+                "type": message_type,
+                "isBulk": True,
+                "priority": priority,
+                "priority_class": priority_class,
+                "payload": {**payload, recipients_key: recipients[start:start + settings.job_chunk_size]},
+                "job_id": job_id,
+                "job_positions": list(range(offset + start, offset + min(start + settings.job_chunk_size, len(recipients)))),
+            }
+            for start in range(0, len(recipients), settings.job_chunk_size)
+        ]
+
+    @staticmethod
+    def check_publisher(publisher: Any):
+        """Fail fast (503) when there is no RabbitMQ connection to enqueue on"""
+        if publisher is None or publisher.connection is None:
+            raise ServiceUnavailableError(
+                message="Notification queue unavailable",
+                verboseMessage="No RabbitMQ connection to enqueue the job on"
+            )
+
+    async def enqueue_job(self, job_id: str, publisher: Any, bodies: List[dict]) -> int:
+        """
+        Publish a job's queue messages for the consumers to send
+
+        Args:
+            job_id: Job created with create_job
+            publisher: The EventHandler_Service
+            bodies: Queue messages carrying job_id/job_positions
+
+        Returns:
+            Number of messages the broker confirmed; recipients of the rest are recorded as failed
+        """
+        self.check_publisher(publisher)
+        confirmed = await publisher.send_many(bodies)
+        for body, ok in zip(bodies, confirmed):
+            if not ok:
+                self.record_queue_results(body, [{"status": "failed", "error": "could not be enqueued"}] * len(body["job_positions"]), final=True)
+        if not any(confirmed):
+            raise ServiceUnavailableError(
+                message="Failed to enqueue notification job",
+                verboseMessage=f"The broker confirmed none of the {len(bodies)} messages for job {job_id}"
+            )
+        return sum(confirmed)
+
+    async def enqueue_bulk_job(self, channel: str, provider: str, publisher: Any, recipients: Sequence[str],
+                               recipients_key: str, payload: Dict[str, Any], duplicates: int = 0,
+                               priority: int = None, priority_class: str = None) -> str:
+        """
+        Queue a bulk job, writing only its header on the request path
+
+        One job_ingest message carries the recipients; a consumer records their rows and enqueues
+        the chunk messages (ingest_queued_job), so the request returns once the header is committed
+        and that one message is confirmed.
+
+        Returns:
+            The job id to poll with GET /jobs/{id}
+        """
+        self.check_publisher(publisher)
+        try:
+            job_id = await self.ledger.create_job(
+                channel, str(getattr(provider, "value", provider)), list(recipients), duplicates=duplicates,
+                with_recipients=False
+            )
+        except Exception as e:
+            logging.error(f"Failed to create {channel} job: {str(e)}")
+            raise ServiceUnavailableError(
+                message="Failed to record notification job",
+                verboseMessage=str(e)
+            )
+
+        queued = await publisher.send_message({
+            "type": "job_ingest",
+            "priority": priority,
+            "priority_class": priority_class,
+            "job_id": job_id,
+            "channel": channel,
+            "recipients": list(recipients),
+            "recipients_key": recipients_key,
+            "payload": payload,
+        })
+        if not queued:
+            await self.ledger.fail_job(job_id, "could not be enqueued")
+            raise ServiceUnavailableError(
+                message="Failed to enqueue notification job",
+                verboseMessage=f"The broker did not confirm the ingest message for job {job_id}"
+            )
+        return job_id
+
+    async def ingest_queued_job(self, body: Dict[str, Any], publisher: Any) -> int:
+        """
+        Consumer side of enqueue_bulk_job: record the job's recipients and enqueue its chunk messages
+
+        The rows are written once; a redelivered ingest message only re-enqueues the chunks, whose
+        results the ledger counts once per recipient.
+
+        Returns:
+            Number of chunk messages the broker confirmed
+        """
+        job_id, recipients = body["job_id"], body["recipients"]
+        if not await self.ledger.insert_recipients(job_id, recipients):
+            logging.warning(f"Job {job_id} recipients already recorded, re-enqueueing its chunks")
+        return await self.enqueue_job(job_id, publisher, self.queue_bodies(
+            body["channel"], job_id, recipients, body["recipients_key"], body["payload"],
+            priority=body.get("priority"), priority_class=body.get("priority_class")
+        ))
+
+    async def open_job(self, channel: str, provider: str) -> str:
+        """Persist a job for an upload whose recipients are not known yet"""
+        try:
+            return await self.ledger.open_job(channel, str(getattr(provider, "value", provider)))
+        except Exception as e:
+            logging.error(f"Failed to create {channel} job: {str(e)}")
+            raise ServiceUnavailableError(
+                message="Failed to record notification job",
+                verboseMessage=str(e)
+            )
+
+    async def ingest_job(self, job_id: str, chunks: AsyncIterable[List[str]],
+                         dispatch: Callable[[int, List[str]], Awaitable[Any]],
+                         key: Optional[Callable[[str], str]] = None) -> Tuple[int, int]:
+        """
+        Record and dispatch an upload's recipients chunk by chunk, as they are parsed
+
+        Sending starts with the first chunk. At most upload_buffered_chunks chunks wait to be
+        dispatched; beyond that the upload is read no faster than it is sent, bounding memory.
+
+        Args:
+            job_id: Job created with open_job
+            chunks: Lists of validated recipients
+            dispatch: Sends (or enqueues) the chunk at an offset and records its failures; should not raise
+            key: Dedupe key of a recipient; a recipient whose key was seen earlier in the upload
+                (in any chunk) is dropped
+
+        Returns:
+            Number of recipients recorded and of duplicates dropped. Dispatching the last chunks
+            carries on in the background, as it does for the chunks recorded before an upload that
+            fails partway.
+        """
+        pending: asyncio.Queue = asyncio.Queue(maxsize=settings.upload_buffered_chunks)
+
+        async def dispatcher():
+            while (item := await pending.get()) is not None:
+                try:
+                    await dispatch(*item)
+                except Exception as e:
+                    logging.error(f"Job {job_id} chunk at {item[0]} failed to dispatch: {str(e)}")
+
+        task = asyncio.create_task(dispatcher(), name=f"job-{job_id}")
+        self.dispatchers.add(task)
+        task.add_done_callback(self.dispatchers.discard)
+
+        offset, duplicates, seen = 0, 0, set()
+        try:
+            async for chunk in chunks:
+                if key is not None:
+                    unique = drop_duplicates(chunk, key, seen)
+                    duplicates += len(chunk) - len(unique)
+                    chunk = unique
+                if not chunk:
+                    continue
+                await self.ledger.add_recipients(job_id, offset, chunk)
+                await pending.put((offset, chunk))
+                offset += len(chunk)
+        finally:
+            await pending.put(None)
+            await self.ledger.close_job(job_id, duplicates)
+        return offset, duplicates
+
+    def record_queue_results(self, body: Dict[str, Any], results: Sequence[dict], final: bool = False):
+        """
+        Record the results of a queued job message
+
+        Successes are recorded straight away; failures only once final (dead-lettered), since
+        until then the consumer retries them.
+        """
+        job_id, positions = body.get("job_id"), body.get("job_positions")
+        if not job_id or positions is None:
+            return
+        for position, result in zip(positions, results):
+            if final or result.get("status") == "sent":
+                self.ledger.record(job_id, position, [result])
+
+    async def record_dead_lettered(self, body: Dict[str, Any], reason: str):
+        """Dead-letter hook: a job message's remaining recipients have failed for good"""
+        positions = body.get("job_positions") or []
+        self.record_queue_results(body, [{"status": "failed", "error": reason}] * len(positions), final=True)
+
+    async def fail_dead_lettered_job(self, body: Dict[str, Any], reason: str):
+        """Dead-letter hook for job_ingest: none of the job's chunks will be enqueued"""
+        if body.get("job_id"):
+            await self.ledger.fail_job(body["job_id"], reason)
+
+    async def get_job(self, job_id: str, recipients: bool = False, limit: int = 100) -> Dict[str, Any]:
+        """
+        Get a job's progress
+
+        Returns:
+            Dictionary with job status and counters
+        """
+        try:
+            job = await self.ledger.get_job(job_id, recipients=recipients, limit=limit)
+        except Exception as e:
+            logging.error(f"Failed to load job {job_id}: {str(e)}")
+            raise ServiceUnavailableError(
+                message="Failed to load notification job",
+                verboseMessage=str(e)
+            )
+        if job is None:
+            raise NotFoundError(
+                message=f"Job {job_id} not found",
+                verboseMessage="No notification job exists with this id"
+            )
+        return {
+            "success": True,
+            "data": job
+        }
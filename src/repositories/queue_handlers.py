@@ -0,0 +1,159 @@
+"""
+Queue Handlers - consume the notification messages and broadcasts published to RabbitMQ
+
+Registered on EventHandler_Service by src.services.notification_runtime, for both the API's
+consumers and `python -m src.worker`.
+"""
+import asyncio
+from src.core import logging
+from src.repositories.sms_repository import SMSRepository
+from src.repositories.email_repository import EmailRepository
+from src.repositories.job_repository import JobRepository
+from src.services import HandlerStatus, bulk_handler_result, batch_handler_results
+from src.utils.helpers.errors import BadRequestError
+
+sms_repo = SMSRepository()
+email_repo = EmailRepository()
+job_repo = JobRepository()
+
+
+def sms_text(sms_data: dict):
+    """Message text of a queued SMS: plain, or wrapped as {"response": text} by upstream producers"""
+    message = sms_data.get('message')
+    if isinstance(message, dict) and message.get('response') is not None:
+        return message.get('response')
+    return message
+
+
+def sms_batch_key(payload: dict):
+    """Single sends with the same provider, type and text can share one bulk call"""
+    sms_data = payload.get("payload", {})
+    if payload.get("isBulk", False):
+        return None
+    message = sms_text(sms_data)
+    if not isinstance(message, str):
+        return None
+    return (sms_data.get('realm'), sms_data.get('type', 'FLASH'), message)
+
+
+async def process_sms_batch(payloads: list):
+    """Send queued single SMS that share a batch key through the provider's bulk path"""
+    sms_data = payloads[0].get("payload", {})
+    try:
+        result = await sms_repo.send_bulk_sms(
+            phone_numbers = [payload["payload"].get('phone_number') for payload in payloads],
+            message = sms_text(sms_data),
+            realm = sms_data.get('realm'),
+            type = sms_data.get('type', 'FLASH')
+        )
+        for payload, recipient_result in zip(payloads, result["data"]["results"]):
+            job_repo.record_queue_results(payload, [recipient_result])
+        return batch_handler_results(result["data"]["results"])
+    except BadRequestError:
+        # Let each message be validated (and dead-lettered) on its own
+        return await asyncio.gather(*[process_sms_message(payload) for payload in payloads])
+
+
+async def process_sms_message(payload: dict):
+    """Process sms message from queue, reporting a HandlerStatus back to the consumer"""
+    try:
+        sms_data = payload.get("payload", {})
+        is_bulk = payload.get("isBulk", False)
+        logging.info(f"sms message payload: {sms_data}")
+
+        if is_bulk:
+            result = await sms_repo.send_bulk_sms(**sms_data)
+            job_repo.record_queue_results(payload, result["data"]["results"])
+            return bulk_handler_result(payload, "phone_numbers", result["data"]["results"])
+
+        result = await sms_repo.send_single_sms(
+            phone_number = sms_data.get('phone_number'),
+            message = sms_text(sms_data),
+            realm = sms_data.get('realm')
+        )
+        job_repo.record_queue_results(payload, [result["data"]])
+        if not result["success"]:
+            return {"status": HandlerStatus.RETRY, "error": result["data"].get("error", "SMS not sent")}
+
+        return {"status": HandlerStatus.SUCCESS}
+    except (BadRequestError, TypeError, AttributeError, KeyError) as e:
+        # Malformed payload or unknown provider: retrying will not help
+        logging.error(f"failed to process sms message {getattr(e, 'message', str(e))}")
+        return {"status": HandlerStatus.FAILED, "error": getattr(e, 'message', str(e))}
+    except Exception as e:
+        logging.error(f"failed to process sms message {str(e)}")
+        return {"status": HandlerStatus.RETRY, "error": getattr(e, 'verboseMessage', None) or str(e)}
+
+
+def email_batch_key(payload: dict):
+    """Single sends with the same provider and content can share one bulk call"""
+    email_data = payload.get("payload", {})
+    if payload.get("isBulk", False) or email_data.get("template_id"):
+        return None
+    return (email_data.get("provider", "erp"), email_data.get("subject"), email_data.get("body"), email_data.get("html_body"))
+
+
+async def process_email_batch(payloads: list):
+    """Send queued single emails that share a batch key through the provider's bulk path"""
+    email_data = payloads[0].get("payload", {})
+    try:
+        result = await email_repo.send_bulk_emails(
+            recipients = [payload["payload"].get("to_email") for payload in payloads],
+            subject = email_data.get("subject"),
+            body = email_data.get("body"),
+            html_body = email_data.get("html_body"),
+            provider = email_data.get("provider", "erp")
+        )
+        for payload, recipient_result in zip(payloads, result["data"]["results"]):
+            job_repo.record_queue_results(payload, [recipient_result])
+        return batch_handler_results(result["data"]["results"])
+    except BadRequestError:
+        # Let each message be validated (and dead-lettered) on its own
+        return await asyncio.gather(*[process_email_message(payload) for payload in payloads])
+
+
+async def process_email_message(payload: dict):
+    """Process email message from queue, reporting a HandlerStatus back to the consumer"""
+    try:
+        email_data = payload.get("payload", {})
+        is_bulk = payload.get("isBulk", False)
+        logging.info(f"email message payload: {email_data}")
+
+        if is_bulk:
+            result = await email_repo.send_bulk_emails(**email_data)
+            job_repo.record_queue_results(payload, result["data"]["results"])
+            return bulk_handler_result(payload, "recipients", result["data"]["results"])
+
+        result = await email_repo.send_single_email(**email_data)
+        job_repo.record_queue_results(payload, [result["data"]])
+        if not result["success"]:
+            return {"status": HandlerStatus.RETRY, "error": result["data"].get("error", "email not sent")}
+
+        return {"status": HandlerStatus.SUCCESS}
+    except (BadRequestError, TypeError, AttributeError, KeyError) as e:
+        # Malformed payload or unknown provider: retrying will not help
+        logging.error(f"failed to process email message {getattr(e, 'message', str(e))}")
+        return {"status": HandlerStatus.FAILED, "error": getattr(e, 'message', str(e))}
+    except Exception as e:
+        logging.error(f"failed to process email message {str(e)}")
+        return {"status": HandlerStatus.RETRY, "error": getattr(e, 'verboseMessage', None) or str(e)}
+
+
+async def process_job_ingest(payload: dict, publisher):
+    """Expand a queued bulk job into its chunk messages, publishing them through publisher"""
+    try:
+        queued = await job_repo.ingest_queued_job(payload, publisher)
+        return {"status": HandlerStatus.SUCCESS, "queued": queued}
+    except (TypeError, AttributeError, KeyError) as e:
+        # Malformed ingest message: retrying will not help
+        logging.error(f"failed to ingest job {payload.get('job_id')}: {str(e)}")
+        return {"status": HandlerStatus.FAILED, "error": str(e)}
+    except Exception as e:
+        logging.error(f"failed to ingest job {payload.get('job_id')}: {str(e)}")
+        return {"status": HandlerStatus.RETRY, "error": getattr(e, 'verboseMessage', None) or str(e)}
+
+
+async def process_template_invalidation(body: dict):
+    """Drop this process's cached ERP templates (one template_id, or all of them) on a broadcast invalidation"""
+    result = await email_repo.invalidate_template_cache(template_id=body.get("template_id"))
+    return result["data"]
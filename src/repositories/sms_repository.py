@@ -3,9 +3,11 @@ SMS Repository - Business logic for SMS operations
 """
 from datetime import datetime
 from typing import List, Dict, Any
+from src.core import settings
 from src.services.sms_service import SMSServiceFactory
 from src.utils.libs.logging import logging
 from src.utils.helpers.errors import BadRequestError, ServiceUnavailableError
+from src.utils.helpers.recipients import normalize_phone_number, dedupe_recipients, expand_results
 
 
 class SMSRepository:
@@ -14,6 +16,11 @@ class SMSRepository:
     def __init__(self):
         self.factory = SMSServiceFactory()
     
+    @staticmethod
+    def phone_key(phone_number: str) -> str:
+        """Dedupe key of a phone number: its E.164 form"""
+        return normalize_phone_number(phone_number, settings.sms_default_country_code, settings.sms_national_number_digits)
+
     async def send_single_sms(self, phone_number: str, message: str, realm: str, type: str = "FLASH", payload: Any = {}) -> Dict[str, Any]:
         """
         Send a single SMS message
@@ -37,7 +44,7 @@ class SMSRepository:
             if not realm:
                 raise BadRequestError(
                     message="SMS provider realm is required",
-                    verboseMessage="Realm field must be one of: local, psi, thirdparty"
+                    verboseMessage=f"Realm field must be one of: {self.factory.registry.names()}"
                 )
             
             logging.info(f"Sending single SMS to {phone_number} via {realm}")
@@ -92,26 +99,30 @@ class SMSRepository:
             if not realm:
                 raise BadRequestError(
                     message="SMS provider realm is required",
-                    verboseMessage="Realm field must be one of: local, psi, thirdparty"
+                    verboseMessage=f"Realm field must be one of: {self.factory.registry.names()}"
                 )
             
             
+            # Send each number once: its +234…, 234… and 0… forms are the same recipient
+            unique, index_of = dedupe_recipients(phone_numbers, self.phone_key)
+
             # Get appropriate provider based on realm
             provider = self.factory.get_provider(realm)
-            results = await provider.send_bulk(phone_numbers, message, type, payload)
+            results = await provider.send_bulk(unique, message, type, payload)
             
             # Calculate statistics
             successful = sum(1 for r in results if r.get("status") == "sent")
             failed = len(results) - successful
-            logging.info(f"Sending bulk SMS to {len(phone_numbers)} recipients via {realm}")
+            logging.info(f"Sending bulk SMS to {len(unique)} recipients via {realm}, {len(phone_numbers) - len(unique)} duplicates dropped")
             
             return {
                 "success": failed == 0,
                 "data": {
-                    "total": len(results),
+                    "total": len(phone_numbers),
                     "successful": successful,
                     "failed": failed,
-                    "results": results,
+                    "duplicates_dropped": len(phone_numbers) - len(unique),
+                    "results": expand_results(results, index_of),
                     "timestamp": datetime.utcnow().isoformat()
                 }
             }
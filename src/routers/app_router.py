@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, status, Request, BackgroundTasks
 from fastapi.responses import Response
 from src.utils import build_success_response, build_error_response, check_rabbitmq, check_db, check_url_health
 from src.core import logging, settings, engine, db
+from src.services.sms_service import sms_http_pool
 import asyncio
 
 
@@ -30,6 +31,7 @@ async def health_check(request: Request):
         "db": _db,
         "erp": erp,
         "smpp": smpp,
+        "sms_http_pool": sms_http_pool.stats(),
         # "pisi": pisi,
         # "coroperate": coroperate
     }
@@ -1,15 +1,20 @@
+import hmac
 from fastapi import APIRouter, status, BackgroundTasks, Request, Depends, Header
 from typing import Optional
 from src.schemas import (
-    EmailSingleRequest, EmailBulkRequest, EmailResponse,
+    EmailSingleRequest, EmailBulkRequest, EmailBulkUploadParams, EmailResponse,
     BulkNotificationResponse
 )
-from src.repositories import (EmailRepository)
-from src.utils.helpers import (build_success_response, build_error_response, BaseError)
+from src.repositories import (EmailRepository, JobRepository)
+from src.utils.helpers import (
+    build_success_response, build_error_response, BaseError, BadRequestError,
+    RecipientStream, upload_format, validate_email_address, drop_duplicates, normalize_email
+)
 from src.core import (logging, settings)
 
 router = APIRouter(tags=["Email Notifications"])
 email_repo = EmailRepository()
+job_repo = JobRepository()
 
             
 @router.post(
@@ -18,20 +23,53 @@ email_repo = EmailRepository()
     summary="Send Single Email",
     description="Send a single email using specified provider (smtp or erp)"
 )
-async def send_single_email(request: EmailSingleRequest, background_tasks: BackgroundTasks):
+async def send_single_email(request: EmailSingleRequest, background_tasks: BackgroundTasks, http_request: Request):
     try:
-        background_tasks.add_task(
-            email_repo.send_single_email, 
-            to_email=request.to_email,
-            subject=request.subject,
-            body=request.body,
-            html_body=request.html_body,
-            provider=request.provider,
-            template_id=request.template_id
-        )    
+        publisher = getattr(http_request.app.state, "eventrouter_handler", None)
+        if settings.http_dispatch_mode == "queue":
+            job_repo.check_publisher(publisher)
+
+        job_id = await job_repo.create_job("email", request.provider, [request.to_email], is_bulk=False)
+        if settings.http_dispatch_mode == "queue":
+            await job_repo.enqueue_job(job_id, publisher, [{
+                "type": "email",
+                "priority": request.priority,
+                "priority_class": request.priority_class,
+                "payload": {
+                    "to_email": request.to_email,
+                    "subject": request.subject,
+                    "body": request.body,
+                    "html_body": request.html_body,
+                    "provider": request.provider,
+                    "template_id": request.template_id
+                },
+                "job_id": job_id,
+                "job_positions": [0],
+            }])
+        else:
+            background_tasks.add_task(
+                job_repo.run_job,
+                job_id,
+                [request.to_email],
+                lambda chunk: email_repo.send_single_email(
+                    to_email=chunk[0],
+                    subject=request.subject,
+                    body=request.body,
+                    html_body=request.html_body,
+                    provider=request.provider,
+                    template_id=request.template_id
+                )
+            )    
         return build_success_response(
             message="Email operation in progress",
-            status=status.HTTP_200_OK
+            status=status.HTTP_200_OK,
+            data={"job_id": job_id}
+        )
+    except BaseError as e:
+        return build_error_response(
+            message=e.message,
+            status=e.httpCode,
+            data={"error_type": e.errorType, "verbose_message": e.verboseMessage}
         )
     except Exception as e:
         logging.error(f"Unexpected error in email send: {str(e)}")
@@ -85,20 +123,48 @@ async def webhook_email(request: Request, background_tasks: BackgroundTasks, x_g
     summary="Send Bulk Emails",
     description="Send emails to multiple recipients using specified provider"
 )
-async def send_bulk_emails(request: EmailBulkRequest, background_tasks: BackgroundTasks):
+async def send_bulk_emails(request: EmailBulkRequest, background_tasks: BackgroundTasks, http_request: Request):
     try:
-        background_tasks.add_task(
-            email_repo.send_bulk_emails, 
-            recipients=request.recipients,
-            subject=request.subject,
-            body=request.body,
-            html_body=request.html_body,
-            provider=request.provider
-        )    
+        publisher = getattr(http_request.app.state, "eventrouter_handler", None)
+        if settings.http_dispatch_mode == "queue":
+            job_repo.check_publisher(publisher)
+
+        # Deduplicate the whole list up front: chunks are sent separately, so per-send dedupe
+        # would miss repeats that land in different chunks
+        recipients = drop_duplicates(request.recipients, normalize_email)
+        duplicates = len(request.recipients) - len(recipients)
+        if settings.http_dispatch_mode == "queue":
+            # Only the job header is written here: a consumer records the recipients and enqueues their chunks
+            job_id = await job_repo.enqueue_bulk_job(
+                "email", request.provider, publisher, recipients, "recipients",
+                {"subject": request.subject, "body": request.body, "html_body": request.html_body, "provider": request.provider},
+                duplicates=duplicates, priority=request.priority, priority_class=request.priority_class
+            )
+        else:
+            job_id = await job_repo.create_job("email", request.provider, recipients, duplicates=duplicates)
+            background_tasks.add_task(
+                job_repo.run_job,
+                job_id,
+                recipients,
+                lambda chunk: email_repo.send_bulk_emails(
+                    recipients=chunk,
+                    subject=request.subject,
+                    body=request.body,
+                    html_body=request.html_body,
+                    provider=request.provider
+                )
+            )    
         
         return build_success_response(
             message="Bulk emails operation in progress",
-            status=status.HTTP_200_OK
+            status=status.HTTP_200_OK,
+            data={"job_id": job_id, "duplicates_dropped": duplicates}
+        )
+    except BaseError as e:
+        return build_error_response(
+            message=e.message,
+            status=e.httpCode,
+            data={"error_type": e.errorType, "verbose_message": e.verboseMessage}
         )
     except Exception as e:
         logging.error(f"Unexpected error in bulk email send: {str(e)}")
@@ -108,21 +174,118 @@ async def send_bulk_emails(request: EmailBulkRequest, background_tasks: Backgrou
             data={"error": str(e)}
         )
 
-async def process_email_message(payload: dict):
-    """Process email message from queue"""
+@router.post(
+    "/email/bulk/upload",
+    status_code=status.HTTP_200_OK,
+    summary="Upload Bulk Email Recipients",
+    description="Stream email addresses as NDJSON or CSV (Content-Type application/x-ndjson or text/csv); they are validated and sent in chunks while the upload is still being read"
+)
+async def upload_bulk_emails(http_request: Request, params: EmailBulkUploadParams = Depends()):
+    job_id = None
     try:
-        email_type = payload.get("type")
-        email_data = payload.get("payload", {})
-        is_bulk = payload.get("isBulk", False)
-        logging.info(f"email message payload: {email_data}")
+        recipients = RecipientStream(
+            http_request.stream(),
+            upload_format(http_request.headers.get("content-type")),
+            validate_email_address,
+            columns=("email", "recipient", "to_email"),
+            chunk_size=settings.job_chunk_size,
+            max_recipients=settings.upload_max_recipients,
+            max_line_bytes=settings.upload_max_line_bytes
+        )
+        publisher = getattr(http_request.app.state, "eventrouter_handler", None)
+        if settings.http_dispatch_mode == "queue":
+            job_repo.check_publisher(publisher)
 
-        await email_repo.send_bulk_emails(
-            **email_data
-        ) if is_bulk else await email_repo.send_single_email(**email_data)
+        job_id = await job_repo.open_job("email", params.provider)
+        if settings.http_dispatch_mode == "queue":
+            dispatch = lambda offset, chunk: job_repo.enqueue_job(job_id, publisher, job_repo.queue_bodies(
+                "email", job_id, chunk, "recipients",
+                {"subject": params.subject, "body": params.body, "html_body": params.html_body, "provider": params.provider},
+                priority=params.priority, priority_class=params.priority_class, offset=offset
+            ))
+        else:
+            dispatch = lambda offset, chunk: job_repo.run_chunk(
+                job_id,
+                offset,
+                chunk,
+                lambda emails: email_repo.send_bulk_emails(
+                    recipients=emails,
+                    subject=params.subject,
+                    body=params.body,
+                    html_body=params.html_body,
+                    provider=params.provider
+                )
+            )
 
-        return {"status": "success"}
+        accepted, duplicates = await job_repo.ingest_job(job_id, recipients, dispatch, key=normalize_email)
+        if not accepted:
+            raise BadRequestError(
+                message="No valid email addresses in upload",
+                verboseMessage=f"{recipients.invalid} rows rejected"
+            )
+
+        return build_success_response(
+            message="Bulk email upload received, sending in progress",
+            status=status.HTTP_200_OK,
+            data={
+                "job_id": job_id, "accepted": accepted, "duplicates_dropped": duplicates,
+                "invalid": recipients.invalid, "errors": recipients.errors
+            }
+        )
+    except BaseError as e:
+        # Recipients received before the failure are still sent: the job_id lets the client
+        # follow them rather than re-uploading them
+        return build_error_response(
+            message=e.message,
+            status=e.httpCode,
+            data={"error_type": e.errorType, "verbose_message": e.verboseMessage, "job_id": job_id}
+        )
     except Exception as e:
-        logging.error(f"failed to process email message {str(e)}")
-        return {"status": "failed", "error": str(e)}
+        logging.error(f"Unexpected error in bulk email upload: {str(e)}")
+        return build_error_response(
+            message="An unexpected error occurred",
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            data={"error": str(e), "job_id": job_id}
+        )
 
+@router.delete(
+    "/email/templates/cache",
+    status_code=status.HTTP_200_OK,
+    summary="Invalidate Email Template Cache",
+    description="Drop cached ERP mail templates (a single template_id, or all of them) in every API and worker process"
+)
+async def invalidate_template_cache(http_request: Request, template_id: Optional[str] = None, x_api_key: Optional[str] = Header(None)):
+    try:
+        admin_key = settings.template_cache_admin_key
+        if not admin_key or not hmac.compare_digest((x_api_key or "").encode(), admin_key.encode()):
+            return build_error_response(
+                message="Invalid API key",
+                status=status.HTTP_401_UNAUTHORIZED
+            )
 
+        result = await email_repo.invalidate_template_cache(template_id=template_id)
+        # The other processes drop their copies on the broadcast; when it cannot be published
+        # they keep serving them until erp_template_cache_ttl expires
+        publisher = getattr(http_request.app.state, "eventrouter_handler", None)
+        broadcast = publisher is not None and await publisher.broadcast({
+            "type": "email_template_invalidate",
+            "template_id": template_id
+        })
+        return build_success_response(
+            message="Template cache invalidated",
+            status=status.HTTP_200_OK,
+            data={**result["data"], "broadcast": broadcast}
+        )
+    except BaseError as e:
+        return build_error_response(
+            message=e.message,
+            status=e.httpCode,
+            data={"error_type": e.errorType, "verbose_message": e.verboseMessage}
+        )
+    except Exception as e:
+        logging.error(f"Unexpected error invalidating template cache: {str(e)}")
+        return build_error_response(
+            message="An unexpected error occurred",
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            data={"error": str(e)}
+        )
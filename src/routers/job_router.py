@@ -0,0 +1,36 @@
+from fastapi import APIRouter, status, Query
+from src.repositories import (JobRepository)
+from src.utils.helpers import (build_success_response, build_error_response, BaseError)
+from src.core import (logging)
+
+router = APIRouter(tags=["Notification Jobs"])
+job_repo = JobRepository()
+
+
+@router.get(
+    "/jobs/{job_id}",
+    status_code=status.HTTP_200_OK,
+    summary="Get Notification Job",
+    description="Progress of an SMS or email submission: status and sent/failed/pending counters, optionally with recipient results (failures first)"
+)
+async def get_job(job_id: str, recipients: bool = False, limit: int = Query(100, ge=1, le=1000)):
+    try:
+        result = await job_repo.get_job(job_id, recipients=recipients, limit=limit)
+        return build_success_response(
+            message="Job retrieved",
+            status=status.HTTP_200_OK,
+            data=result["data"]
+        )
+    except BaseError as e:
+        return build_error_response(
+            message=e.message,
+            status=e.httpCode,
+            data={"error_type": e.errorType, "verbose_message": e.verboseMessage}
+        )
+    except Exception as e:
+        logging.error(f"Unexpected error loading job: {str(e)}")
+        return build_error_response(
+            message="An unexpected error occurred",
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            data={"error": str(e)}
+        )
@@ -1,14 +1,18 @@
 from fastapi import APIRouter, status, BackgroundTasks, Request, Depends
 from src.schemas import (
-    SMSSingleRequest, SMSBulkRequest, SMSResponse,
+    SMSSingleRequest, SMSBulkRequest, SMSBulkUploadParams, SMSResponse,
     BulkNotificationResponse
 )
-from src.repositories import (SMSRepository)
-from src.utils.helpers import (build_success_response, build_error_response, BaseError)
+from src.repositories import (SMSRepository, JobRepository)
+from src.utils.helpers import (
+    build_success_response, build_error_response, BaseError, BadRequestError,
+    RecipientStream, upload_format, validate_phone_number, drop_duplicates
+)
 from src.core import (logging, settings)
 
 router = APIRouter(tags=["Sms Notifications"])
 sms_repo = SMSRepository()
+job_repo = JobRepository()
 
 @router.post(
     "/sms/send",
@@ -16,19 +20,45 @@ sms_repo = SMSRepository()
     summary="Send Single SMS",
     description="Send a single SMS message to a recipient using specified provider (local, psi, or thirdparty)"
 )
-async def send_single_sms(request: SMSSingleRequest, background_tasks: BackgroundTasks):
+async def send_single_sms(request: SMSSingleRequest, background_tasks: BackgroundTasks, http_request: Request):
     try:
-        background_tasks.add_task(
-            sms_repo.send_single_sms,
-            phone_number=request.phone_number,
-            message=request.message,
-            realm=request.realm,
-            payload=request
-        )
+        publisher = getattr(http_request.app.state, "eventrouter_handler", None)
+        if settings.http_dispatch_mode == "queue":
+            job_repo.check_publisher(publisher)
+
+        job_id = await job_repo.create_job("sms", request.realm, [request.phone_number], is_bulk=False)
+        if settings.http_dispatch_mode == "queue":
+            await job_repo.enqueue_job(job_id, publisher, [{
+                "type": "sms",
+                "priority": request.priority,
+                "priority_class": request.priority_class,
+                "payload": {"phone_number": request.phone_number, "message": request.message, "realm": request.realm},
+                "job_id": job_id,
+                "job_positions": [0],
+            }])
+        else:
+            background_tasks.add_task(
+                job_repo.run_job,
+                job_id,
+                [request.phone_number],
+                lambda chunk: sms_repo.send_single_sms(
+                    phone_number=chunk[0],
+                    message=request.message,
+                    realm=request.realm,
+                    payload=request
+                )
+            )
         
         return build_success_response(
             message="SMS sending operation in progress",
-            status=status.HTTP_200_OK
+            status=status.HTTP_200_OK,
+            data={"job_id": job_id}
+        )
+    except BaseError as e:
+        return build_error_response(
+            message=e.message,
+            status=e.httpCode,
+            data={"error_type": e.errorType, "verbose_message": e.verboseMessage}
         )
     except Exception as e:
         logging.error(f"Unexpected error in SMS send: {str(e)}")
@@ -45,19 +75,47 @@ async def send_single_sms(request: SMSSingleRequest, background_tasks: Backgroun
     summary="Send Bulk SMS",
     description="Send SMS messages to multiple recipients using specified provider"
 )
-async def send_bulk_sms(request: SMSBulkRequest, background_tasks: BackgroundTasks):
+async def send_bulk_sms(request: SMSBulkRequest, background_tasks: BackgroundTasks, http_request: Request):
     try:
-        background_tasks.add_task(
-            sms_repo.send_bulk_sms,
-            phone_numbers=request.recipients,
-            message=request.message,
-            realm=request.realm,
-            payload=request
-        )
+        publisher = getattr(http_request.app.state, "eventrouter_handler", None)
+        if settings.http_dispatch_mode == "queue":
+            job_repo.check_publisher(publisher)
+
+        # Deduplicate the whole list up front: chunks are sent separately, so per-send dedupe
+        # would miss repeats that land in different chunks
+        recipients = drop_duplicates(request.recipients, sms_repo.phone_key)
+        duplicates = len(request.recipients) - len(recipients)
+        if settings.http_dispatch_mode == "queue":
+            # Only the job header is written here: a consumer records the recipients and enqueues their chunks
+            job_id = await job_repo.enqueue_bulk_job(
+                "sms", request.realm, publisher, recipients, "phone_numbers",
+                {"message": request.message, "realm": request.realm},
+                duplicates=duplicates, priority=request.priority, priority_class=request.priority_class
+            )
+        else:
+            job_id = await job_repo.create_job("sms", request.realm, recipients, duplicates=duplicates)
+            background_tasks.add_task(
+                job_repo.run_job,
+                job_id,
+                recipients,
+                lambda chunk: sms_repo.send_bulk_sms(
+                    phone_numbers=chunk,
+                    message=request.message,
+                    realm=request.realm,
+                    payload=request
+                )
+            )
         
         return build_success_response(
             message="Bulk SMS operation in progress",
-            status=status.HTTP_200_OK
+            status=status.HTTP_200_OK,
+            data={"job_id": job_id, "duplicates_dropped": duplicates}
+        )
+    except BaseError as e:
+        return build_error_response(
+            message=e.message,
+            status=e.httpCode,
+            data={"error_type": e.errorType, "verbose_message": e.verboseMessage}
         )
     except Exception as e:
         logging.error(f"Unexpected error in bulk SMS send: {str(e)}")
@@ -68,27 +126,75 @@ async def send_bulk_sms(request: SMSBulkRequest, background_tasks: BackgroundTas
         )
 
 
-async def process_sms_message(payload: dict):
-    """Process sms message from queue"""
+@router.post(
+    "/sms/bulk/upload",
+    status_code=status.HTTP_200_OK,
+    summary="Upload Bulk SMS Recipients",
+    description="Stream phone numbers as NDJSON or CSV (Content-Type application/x-ndjson or text/csv); they are validated and sent in chunks while the upload is still being read"
+)
+async def upload_bulk_sms(http_request: Request, params: SMSBulkUploadParams = Depends()):
+    job_id = None
     try:
-        sms_type = payload.get("type")
-        sms_data = payload.get("payload", {})
-        is_bulk = payload.get("isBulk", False)
-        logging.info(f"sms message payload: {sms_data}")
-
-        await sms_repo.send_bulk_sms(
-            **sms_data
-        ) if is_bulk else await sms_repo.send_single_sms(
-            phone_number = sms_data.get('phone_number'),
-            message = sms_data.get('message').get('response') if sms_data.get('message').get('response') is not None else sms_data.get('message'),
-            realm = sms_data.get('realm')
+        recipients = RecipientStream(
+            http_request.stream(),
+            upload_format(http_request.headers.get("content-type")),
+            validate_phone_number,
+            columns=("phone_number", "recipient", "phone"),
+            chunk_size=settings.job_chunk_size,
+            max_recipients=settings.upload_max_recipients,
+            max_line_bytes=settings.upload_max_line_bytes
         )
+        publisher = getattr(http_request.app.state, "eventrouter_handler", None)
+        if settings.http_dispatch_mode == "queue":
+            job_repo.check_publisher(publisher)
 
-        return {"status": "success"}
-    except Exception as e:
-        logging.error(f"failed to process sms message {str(e)}")
-        return {"status": "failed", "error": str(e)}
-
-
+        job_id = await job_repo.open_job("sms", params.realm)
+        if settings.http_dispatch_mode == "queue":
+            dispatch = lambda offset, chunk: job_repo.enqueue_job(job_id, publisher, job_repo.queue_bodies(
+                "sms", job_id, chunk, "phone_numbers",
+                {"message": params.message, "realm": params.realm},
+                priority=params.priority, priority_class=params.priority_class, offset=offset
+            ))
+        else:
+            dispatch = lambda offset, chunk: job_repo.run_chunk(
+                job_id,
+                offset,
+                chunk,
+                lambda phone_numbers: sms_repo.send_bulk_sms(
+                    phone_numbers=phone_numbers,
+                    message=params.message,
+                    realm=params.realm,
+                    payload=params
+                )
+            )
 
+        accepted, duplicates = await job_repo.ingest_job(job_id, recipients, dispatch, key=sms_repo.phone_key)
+        if not accepted:
+            raise BadRequestError(
+                message="No valid phone numbers in upload",
+                verboseMessage=f"{recipients.invalid} rows rejected"
+            )
 
+        return build_success_response(
+            message="Bulk SMS upload received, sending in progress",
+            status=status.HTTP_200_OK,
+            data={
+                "job_id": job_id, "accepted": accepted, "duplicates_dropped": duplicates,
+                "invalid": recipients.invalid, "errors": recipients.errors
+            }
+        )
+    except BaseError as e:
+        # Recipients received before the failure are still sent: the job_id lets the client
+        # follow them rather than re-uploading them
+        return build_error_response(
+            message=e.message,
+            status=e.httpCode,
+            data={"error_type": e.errorType, "verbose_message": e.verboseMessage, "job_id": job_id}
+        )
+    except Exception as e:
+        logging.error(f"Unexpected error in bulk SMS upload: {str(e)}")
+        return build_error_response(
+            message="An unexpected error occurred",
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            data={"error": str(e), "job_id": job_id}
+        )
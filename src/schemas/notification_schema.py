@@ -1,24 +1,34 @@
 """
 Notification Schemas - Pydantic models for request/response validation
 """
-from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional, Dict, Any
-from enum import Enum
+from pydantic import AfterValidator, BaseModel, EmailStr, Field
+from typing import Annotated, List, Optional, Dict, Any
 
 
-# ==================== ENUMS ====================
-class SMSTypeEnum(str, Enum):
-    """SMS Provider Types"""
-    LOCAL = "smpp"
-    PSI = "pisi"
-    EXTERNAL = "external"
-    THIRDPARTY = "coroperate"
+# ==================== PROVIDER NAMES ====================
+def sms_realm(realm: str) -> str:
+    """Accept any SMS provider registered with SMSServiceFactory, built in or added through SMS_PROVIDERS"""
+    from src.services.sms_service import SMSServiceFactory  # deferred: the services load the settings
+    return SMSServiceFactory.registry.check(realm)
 
 
-class EmailTypeEnum(str, Enum):
-    """Email Provider Types"""
-    ERP = "erp"
-    SMTP = "smtp"
+def email_provider(provider: str) -> str:
+    """Accept any email provider registered with EmailServiceFactory, built in or added through EMAIL_PROVIDERS"""
+    from src.services.email_service import EmailServiceFactory  # deferred: the services load the settings
+    return EmailServiceFactory.registry.check(provider)
+
+
+def priority_class(name: str) -> str:
+    """Accept the priority classes configured in QUEUE_PRIORITY_CLASSES"""
+    from src.core.config import settings  # deferred: see sms_realm
+    if name not in settings.queue_priority_classes:
+        raise ValueError(f"Unknown priority class: {name} (configured: {', '.join(settings.queue_priority_classes)})")
+    return name
+
+
+SMSRealm = Annotated[str, AfterValidator(sms_realm)]
+EmailProvider = Annotated[str, AfterValidator(email_provider)]
+PriorityClass = Annotated[str, AfterValidator(priority_class)]
 
 
 # ==================== SMS SCHEMAS ====================
@@ -26,7 +36,9 @@ class SMSSingleRequest(BaseModel):
     """Single SMS Request"""
     phone_number: str = Field(..., description="Recipient phone number")
     message: str = Field(..., description="SMS message content")
-    realm: SMSTypeEnum = Field(..., description="SMS provider type (smpp, pisi, coroperate)")
+    realm: SMSRealm = Field(..., description="SMS provider (smpp, pisi, external, coroperate or one added through SMS_PROVIDERS)")
+    priority: Optional[int] = Field(None, ge=0, le=10, description="Queue priority 0-10; higher is delivered first (e.g. 10 for OTPs)")
+    priority_class: Optional[PriorityClass] = Field(None, description="Priority class from QUEUE_PRIORITY_CLASSES (e.g. otp); routes to its 'type.class' queue and sets the priority when none is given")
     
     class Config:
         example = {
@@ -40,7 +52,9 @@ class SMSBulkRequest(BaseModel):
     """Bulk SMS Request"""
     recipients: List[str] = Field(..., description="List of phone numbers")
     message: str = Field(..., description="SMS message content")
-    realm: SMSTypeEnum =  Field(..., description="SMS provider type (smpp, pisi, coroperate)")
+    realm: SMSRealm = Field(..., description="SMS provider (smpp, pisi, external, coroperate or one added through SMS_PROVIDERS)")
+    priority: Optional[int] = Field(None, ge=0, le=10, description="Queue priority 0-10; higher is delivered first (e.g. 10 for OTPs)")
+    priority_class: Optional[PriorityClass] = Field(None, description="Priority class from QUEUE_PRIORITY_CLASSES (e.g. otp); routes to its 'type.class' queue and sets the priority when none is given")
     
     class Config:
         example = {
@@ -50,6 +64,14 @@ class SMSBulkRequest(BaseModel):
         }
 
 
+class SMSBulkUploadParams(BaseModel):
+    """Bulk SMS Upload - query parameters; the NDJSON/CSV request body carries the phone numbers"""
+    message: str = Field(..., description="SMS message content")
+    realm: SMSRealm = Field(..., description="SMS provider (smpp, pisi, external, coroperate or one added through SMS_PROVIDERS)")
+    priority: Optional[int] = Field(None, ge=0, le=10, description="Queue priority 0-10; higher is delivered first (e.g. 10 for OTPs)")
+    priority_class: Optional[PriorityClass] = Field(None, description="Priority class from QUEUE_PRIORITY_CLASSES (e.g. otp); routes to its 'type.class' queue and sets the priority when none is given")
+
+
 class SMSResponse(BaseModel):
     """SMS Response"""
     phone_number: str
@@ -66,7 +88,9 @@ class EmailSingleRequest(BaseModel):
     body: str = Field(..., description="Email body content")
     html_body: Optional[str] = Field(None, description="HTML email body (optional)")
     template_id: Optional[str] = Field(None, description="Email template id (optional)")
-    provider: EmailTypeEnum = Field(..., description="Email provider type (erp, smtp)")
+    provider: EmailProvider = Field(..., description="Email provider (erp, smtp or one added through EMAIL_PROVIDERS)")
+    priority: Optional[int] = Field(None, ge=0, le=10, description="Queue priority 0-10; higher is delivered first (e.g. 10 for OTPs)")
+    priority_class: Optional[PriorityClass] = Field(None, description="Priority class from QUEUE_PRIORITY_CLASSES (e.g. otp); routes to its 'type.class' queue and sets the priority when none is given")
     
     class Config:
         example = {
@@ -84,7 +108,9 @@ class EmailBulkRequest(BaseModel):
     subject: str = Field(..., description="Email subject")
     body: str = Field(..., description="Email body content")
     html_body: Optional[str] = Field(None, description="HTML email body (optional)")
-    provider: EmailTypeEnum = Field(..., description="Email provider type (erp, smtp)")
+    provider: EmailProvider = Field(..., description="Email provider (erp, smtp or one added through EMAIL_PROVIDERS)")
+    priority: Optional[int] = Field(None, ge=0, le=10, description="Queue priority 0-10; higher is delivered first (e.g. 10 for OTPs)")
+    priority_class: Optional[PriorityClass] = Field(None, description="Priority class from QUEUE_PRIORITY_CLASSES (e.g. otp); routes to its 'type.class' queue and sets the priority when none is given")
     
     class Config:
         example = {
@@ -95,6 +121,16 @@ class EmailBulkRequest(BaseModel):
         }
 
 
+class EmailBulkUploadParams(BaseModel):
+    """Bulk Email Upload - query parameters; the NDJSON/CSV request body carries the email addresses"""
+    subject: str = Field(..., description="Email subject")
+    body: str = Field(..., description="Email body content")
+    html_body: Optional[str] = Field(None, description="HTML email body (optional)")
+    provider: EmailProvider = Field(..., description="Email provider (erp, smtp or one added through EMAIL_PROVIDERS)")
+    priority: Optional[int] = Field(None, ge=0, le=10, description="Queue priority 0-10; higher is delivered first (e.g. 10 for OTPs)")
+    priority_class: Optional[PriorityClass] = Field(None, description="Priority class from QUEUE_PRIORITY_CLASSES (e.g. otp); routes to its 'type.class' queue and sets the priority when none is given")
+
+
 class EmailResponse(BaseModel):
     """Email Response"""
     to_email: str
@@ -150,5 +186,7 @@ class BulkNotificationResponse(BaseModel):
     total: int
     successful: int
     failed: int
+    duplicates_dropped: int = 0
     results: List[Dict[str, Any]]
     timestamp: str
+
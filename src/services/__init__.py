@@ -1,3 +1,3 @@
 from .email_service import EmailServiceFactory
 from .sms_service import SMSServiceFactory
-from .event_handler import EventHandler_Service
+from .event_handler import EventHandler_Service, HandlerStatus, bulk_handler_result, batch_handler_results
@@ -0,0 +1,44 @@
+"""
+Bulk Sender - bounded-concurrency, rate-limited fan-out for provider bulk sends
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, List
+from src.utils.libs.logging import logging
+
+
+class BulkSender:
+    """Runs a send coroutine over many recipients with a concurrency cap and a target msgs/sec"""
+
+    def __init__(self, concurrency: int = 20, rate: float = 0):
+        self.concurrency = max(1, concurrency)
+        self.rate = rate  # messages per second, 0 disables throttling
+        self._next_slot = 0.0
+
+    async def _throttle(self):
+        """Space sends 1/rate seconds apart; the schedule is shared by every bulk on this sender"""
+        if not self.rate:
+            return
+
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def run(self, recipients: list, send: Callable[[Any], Awaitable[dict]]) -> List[dict]:
+        """Send to every recipient, returning results in recipient order"""
+        results: List[dict] = [None] * len(recipients)
+        pending = iter(enumerate(recipients))
+
+        # A fixed pool of workers instead of one task per recipient keeps 50k-recipient sends cheap
+        async def worker():
+            for index, recipient in pending:
+                await self._throttle()
+                try:
+                    results[index] = await send(recipient)
+                except Exception as e:
+                    logging.error(f"Bulk send to {recipient} failed: {str(e)}")
+                    results[index] = {"recipient": recipient, "status": "failed", "error": str(e)}
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(recipients)))))
+        return results
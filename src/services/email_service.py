@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-import uuid, asyncio, httpx, aiosmtplib
+import uuid, asyncio, httpx
 from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
+from aiosmtplib.email import flatten_message
 from src.core.config import (settings, logging)
-from src.utils import (EmailLib)
+from src.utils import (EmailLib, SMTPConnectionPool, TTLCache)
 from .erp_service import ERPService
+from .bulk_sender import BulkSender
+from .provider_registry import ProviderRegistry
 
 
 class BaseEmailProvider(ABC):
@@ -30,37 +34,49 @@ class SMTPEmailProvider(BaseEmailProvider):
         self.smtp_user = settings.mail_username
         self.smtp_password = settings.mail_password
         self.from_email = f"{settings.mail_from_name} <{settings.mail_sender}>"
+        self.pool = SMTPConnectionPool(
+            hostname=self.smtp_host,
+            port=self.smtp_port,
+            username=self.smtp_user,
+            password=self.smtp_password,
+            start_tls=self.smtp_port in (587, 25),
+            timeout=30,
+            size=settings.smtp_pool_size,
+            max_messages=settings.smtp_pool_max_messages,
+            health_check_interval=settings.smtp_pool_health_check_interval
+        )
+        self.bulk_sender = BulkSender(concurrency=settings.smtp_pool_size)
     
-    async def send(self, to_email: str, subject: str, body: str, html_body: str = None) -> dict:
+    async def aclose(self):
+        await self.pool.aclose()
+    
+    def _message_id(self) -> str:
+        return f"<{uuid.uuid4()}@{settings.mail_sender.split('@')[-1]}>"
+
+    async def _build_message(self, subject: str, body: str, html_body: str = None) -> EmailMessage:
+        """Build the recipient-independent part of the message (everything but To and Message-ID)"""
+        msg = EmailMessage()
+        msg.add_header("X-Priority", "1")
+        msg.add_header("Importance", "high")
+        msg["From"] = self.from_email
+        msg["Subject"] = subject
+        if html_body:
+            html_body = await EmailLib.render_template('', 'index', body=html_body)
+            msg.set_content(body or "")
+            msg.add_alternative(html_body, subtype="html")
+        else:
+            msg.set_content(body or "")
+        return msg
+    
+    async def send(self, to_email: str, subject: str, body: str, html_body: str = None, template_id: str = None) -> dict:
         """Send email via SMTP provider"""
         try:
-            message_id = f"<{uuid.uuid4()}@{self.from_email.split('@')[-1]}>"
-            msg = EmailMessage()
-            msg.add_header("X-Priority", "1")
-            msg.add_header("Importance", "high")
-            msg["From"] = self.from_email
+            message_id = self._message_id()
+            msg = await self._build_message(subject, body, html_body)
             msg["To"] = to_email
-            msg["Subject"] = subject
             msg["Message-ID"] = message_id
-            if html_body:
-                html_content = await EmailLib.get_template('', 'index')
-                html_body = html_content.replace('{{body}}', html_body)
-                msg.set_content(body or "")
-                msg.add_alternative(html_body, subtype="html")
-            else:
-                msg.set_content(body or "")
-                
-            send_kwargs = {
-                "hostname": self.smtp_host,
-                "port": self.smtp_port,
-                "timeout": 30,
-            }
-            if self.smtp_user:
-                send_kwargs["username"] = self.smtp_user
-                send_kwargs["password"] = self.smtp_password or None
-                
-            start_tls = self.smtp_port in (587, 25)
-            await aiosmtplib.send(msg, start_tls=start_tls, **send_kwargs)
+
+            await self.pool.send_message(msg)
 
             return {
                 "to_email": to_email,
@@ -76,15 +92,35 @@ class SMTPEmailProvider(BaseEmailProvider):
             }
     
     async def send_bulk(self, recipients: list, subject: str, body: str, html_body: str = None) -> list:
-        """Send bulk emails via SMTP provider"""
-        sem = asyncio.Semaphore(50)
-        async def _send_with_sem(recipient: str):
-            async with sem:
-                return await self.send(recipient, subject, body, html_body)
+        """Send bulk emails via SMTP provider, one worker per pooled session"""
+        # Render and MIME-encode the shared body once (7bit so it is valid on any relay);
+        # each recipient only gets its own To and Message-ID header lines prepended
+        msg = await self._build_message(subject, body, html_body)
+        flat_message = flatten_message(msg, utf8=False, cte_type="7bit")
+
+        async def _send(to_email: str) -> dict:
+            if not to_email.isascii():
+                # needs SMTPUTF8 negotiation, which send_message handles
+                return await self.send(to_email, subject, body, html_body)
+            try:
+                message_id = self._message_id()
+                headers = SMTP_POLICY.fold("To", to_email) + SMTP_POLICY.fold("Message-ID", message_id)
+                await self.pool.sendmail(settings.mail_sender, [to_email], headers.encode("ascii") + flat_message)
 
-        tasks = [asyncio.create_task(_send_with_sem(r)) for r in recipients]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-        return results
+                return {
+                    "to_email": to_email,
+                    "message_id": message_id,
+                    "status": "sent",
+                    "provider": self.provider_name,
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+            except Exception as e:
+                logging.error(f"SMTP email send failed: {str(e)}")
+                return {
+                    "error": str(e)
+                }
+
+        return await self.bulk_sender.run(recipients, _send)
 
 
 class ERPEmailProvider(BaseEmailProvider):
@@ -94,14 +130,29 @@ class ERPEmailProvider(BaseEmailProvider):
         self.provider_name = "ERP"
         self.from_email = f"{settings.mail_from_name} <{settings.mail_sender}>"
         self.erp = ERPService()
+        self.template_cache = TTLCache(maxsize=settings.erp_template_cache_size, ttl=settings.erp_template_cache_ttl)
+    
+    async def aclose(self):
+        await self.erp.aclose()
+
+    async def get_template(self, template_id: str):
+        """Read a mail.template record, served from the TTL/LRU cache when possible"""
+        template = self.template_cache.get(str(template_id))
+        if template is None:
+            template = await self.erp.send_request("mail.template", "read", [template_id])
+            self.template_cache.set(str(template_id), template)
+        return template
+
+    def invalidate_templates(self, template_id: str = None) -> int:
+        return self.template_cache.invalidate(None if template_id is None else str(template_id))
     
     async def send(self, to_email: str, subject: str, body: str, html_body: str = None, template_id: str = None) -> dict:
-        """Send email via ERP provider"""
+        """Send email via ERP provider; once its mail.mail record is created it is accepted, as in _send_chunk"""
         try:
-            message_id = f"<{uuid.uuid4()}@{self.from_email.split('@')[-1]}>"
+            message_id = f"<{uuid.uuid4()}@{settings.mail_sender.split('@')[-1]}>"
 
             if template_id is not None:
-                template = await self.erp.send_request("mail.template", "read", [template_id])
+                template = await self.get_template(template_id)
             
             email_id = await self.erp.send_request("mail.mail", "create", [{
                 "email_to": to_email,
@@ -109,15 +160,6 @@ class ERPEmailProvider(BaseEmailProvider):
                 "email_from": self.from_email,
                 "body_html": html_body if html_body is not None else body
             }])
-            resp = await self.erp.send_request("mail.mail", "send", email_id )
-                
-            return {
-                "to_email": to_email,
-                "message_id": message_id,
-                "status": "sent",
-                "provider": self.provider_name,
-                "timestamp": datetime.utcnow().isoformat()
-            }
         except httpx.HTTPStatusError as e:
             logging.error(f"HTTP error creating mail: {e.response.status_code} - {e.response.text}")
             raise
@@ -127,26 +169,85 @@ class ERPEmailProvider(BaseEmailProvider):
             return {
                 "error": str(e)
             }
+
+        erp_state = "sent"
+        try:
+            await self.erp.send_request("mail.mail", "send", email_id)
+        except Exception as e:
+            logging.warning(f"ERP send failed for created mail {email_id}, left queued for Odoo's mail cron: {str(e)}")
+            erp_state = "queued"
+
+        return {
+            "to_email": to_email,
+            "message_id": message_id,
+            "erp_mail_id": email_id,
+            "erp_state": erp_state,
+            "status": "sent",
+            "provider": self.provider_name,
+            "timestamp": datetime.utcnow().isoformat()
+        }
     
     async def send_bulk(self, recipients: list, subject: str, body: str, html_body: str = None) -> list:
-        """Send bulk emails via ERP provider"""
-        results = []
-        for recipient in recipients:
-            result = await self.send(recipient, subject, body, html_body)
-            results.append(result)
-        return results
+        """Send bulk emails via ERP provider, creating and sending mail.mail records a chunk at a time"""
+        chunk_size = settings.erp_mail_batch_size
+        # chunks run in parallel; ERPService caps how many calls are in flight
+        chunks = await asyncio.gather(*(
+            self._send_chunk(recipients[start:start + chunk_size], subject, body, html_body)
+            for start in range(0, len(recipients), chunk_size)
+        ))
+        return [result for chunk in chunks for result in chunk]
+
+    async def _send_chunk(self, recipients: list, subject: str, body: str, html_body: str = None) -> list:
+        """One multi-record create plus one send for the whole chunk: 2 round trips instead of 2 per recipient
+
+        Once created, the mail.mail records are Odoo's to deliver: if the immediate send fails, its
+        mail queue cron still sends them, so they are reported as accepted rather than failed (a
+        retry would create second records and mail everyone twice).
+        """
+        try:
+            email_ids = await self.erp.send_request("mail.mail", "create", [
+                {
+                    "email_to": recipient,
+                    "subject": subject,
+                    "email_from": self.from_email,
+                    "body_html": html_body if html_body is not None else body
+                }
+                for recipient in recipients
+            ])
+        except Exception as e:
+            logging.error(f"ERP bulk email send failed for {len(recipients)} recipients: {str(e)}")
+            return [{"error": str(e)} for _ in recipients]
+
+        erp_state = "sent"
+        try:
+            await self.erp.send_request("mail.mail", "send", email_ids)
+        except Exception as e:
+            logging.warning(f"ERP send failed for {len(email_ids)} created mails, left queued for Odoo's mail cron: {str(e)}")
+            erp_state = "queued"
+
+        timestamp = datetime.utcnow().isoformat()
+        return [
+            {
+                "to_email": recipient,
+                "message_id": f"<{uuid.uuid4()}@{settings.mail_sender.split('@')[-1]}>",
+                "erp_mail_id": email_id,
+                "erp_state": erp_state,
+                "status": "sent",
+                "provider": self.provider_name,
+                "timestamp": timestamp
+            }
+            for recipient, email_id in zip(recipients, email_ids)
+        ]
 
 
 class EmailServiceFactory:
     _providers = {
         "smtp": SMTPEmailProvider,
-        "erp": ERPEmailProvider
+        "erp": ERPEmailProvider,
+        **settings.email_providers
     }
+    registry = ProviderRegistry("email", _providers)
     
     @classmethod
     def get_provider(cls, provider_type: str) -> BaseEmailProvider:
-        provider_type = provider_type.lower()
-        if provider_type not in cls._providers:
-            raise ValueError(f"Unknown email provider: {provider_type}")
-        
-        return cls._providers[provider_type]()
+        return cls.registry.get(provider_type)
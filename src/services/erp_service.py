@@ -1,53 +1,83 @@
-import httpx
+import asyncio, httpx, itertools
 from src.core import ( logging, settings )
 from typing import Any, Dict
 
 class ERPService:
-    """ERP Provider Implementation"""
-    
-    def __init__(self):
-        self.headers = settings.odoo_headers
-        self.headers["x-api-key"] = settings.api_key
-        self.headers["Connection"] = "keep-alive"
+    """ERP Provider Implementation
+
+    Safe to share between concurrent callers: every call builds its own JSON-RPC payload,
+    requests go over one pooled keep-alive client and at most `erp_max_concurrency` run at once.
+    """
+
+    def __init__(self, client: httpx.AsyncClient = None):
+        self.headers = {
+            **settings.odoo_headers,
+            "x-api-key": settings.api_key,
+            "Connection": "keep-alive"
+        }
         self.url = settings.odoo_url
-        self.payload =  {
-            "jsonrpc": "2.0", 
-            "method": "call", 
+        self._client = client
+        self.pool: httpx.AsyncClient = None
+        self.semaphore = asyncio.Semaphore(settings.erp_max_concurrency)
+        self.request_ids = itertools.count(1)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The injected client, else the pooled one
+
+        Looked up on every use and rebuilt once closed: the ERP email provider lives in the registry
+        beyond a lifespan, and aclose() on shutdown must not leave it holding a dead pool.
+        """
+        if self._client is not None:
+            return self._client
+        if self.pool is None or self.pool.is_closed:
+            self.pool = httpx.AsyncClient(
+                timeout=settings.erp_timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.erp_max_concurrency,
+                    max_keepalive_connections=settings.erp_max_concurrency
+                )
+            )
+        return self.pool
+
+    def generate_payload(self, model: str, action: str, payload) -> Dict:
+        return {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "id": next(self.request_ids),
             "params": {
-                "service": "object", 
+                "service": "object",
                 "method": "execute",
-                "args": [ f"{settings.odoo_db}", f"{settings.odoo_uid}", f"{settings.odoo_api_key}", "", "", "" ]
+                "args": [ f"{settings.odoo_db}", f"{settings.odoo_uid}", f"{settings.odoo_api_key}", model, action, payload ]
             }
         }
 
-    def generate_payload(self, model: str, action: str, payload):
-        form = self.payload
-        form['params']['args'][3] = model
-        form['params']['args'][4] = action
-        form['params']['args'][5] = payload
-        return form
 
-    
     async def make_request(self, payload):
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                resp = await client.post(
-                    f"{self.url}", 
-                    json=payload, 
+            async with self.semaphore:
+                resp = await self.client.post(
+                    f"{self.url}",
+                    json=payload,
                     headers=self.headers
                 )
-                resp.raise_for_status()
-                response = resp.json() if resp.content else {}
-                if 'error' in response.keys():
-                    raise Exception(response['error'])
+            resp.raise_for_status()
+            response = resp.json() if resp.content else {}
+            if 'error' in response.keys():
+                raise Exception(response['error'])
+            if response.get('id') not in (None, payload['id']):
+                raise Exception(f"mismatched JSON-RPC response id {response.get('id')} for request {payload['id']}")
+
+            return response['result'] if 'result' in response.keys() else {}
 
-                return response['result'] if 'result' in response.keys() else {}
-            
         except Exception as e:
-            raise Exception(str(e))
-    
+            raise Exception(f"ERP request {payload['id']} failed: {str(e)}")
+
     async def send_request(self, model: str, action: str, payload: Any) -> dict:
         payload = self.generate_payload(model, action, payload)
         return await self.make_request(payload)
 
-            
\ No newline at end of file
+    async def aclose(self):
+        """Close the pooled client; the next request opens a fresh one"""
+        if self.pool is not None:
+            await self.pool.aclose()
@@ -1,8 +1,60 @@
-import json, asyncio
+import asyncio, itertools, time
+from collections import Counter
 from datetime import datetime
-from typing import Callable, Optional, Any, Dict, List
-from aio_pika import Message, connect_robust, IncomingMessage, Channel
+from enum import Enum
+from typing import Callable, Hashable, Iterable, Optional, Any, Dict, List, Set, Tuple
+from aio_pika import Message, connect_robust, IncomingMessage, Channel, ExchangeType
 from src.core.config import settings, logging
+from src.utils.libs import serializer
+from .queue_metrics import (
+    MESSAGES_CONSUMED, MESSAGE_OUTCOMES, HANDLER_DURATION, MESSAGES_IN_FLIGHT, QUEUE_DEPTH, QUEUE_CONSUMERS
+)
+
+class HandlerStatus(str, Enum):
+    """Outcome a message handler reports back to the consumer"""
+    SUCCESS = "success"  # ack
+    RETRY = "retry"      # transient failure: delayed retry, DLQ once retries run out
+    FAILED = "failed"    # permanent failure (bad payload, unknown provider): straight to the DLQ
+
+
+def bulk_handler_result(body: dict, recipients_key: str, results: list) -> dict:
+    """Handler result for a bulk send: success, or a retry narrowed to the recipients that failed
+
+    A top-level 'job_positions' list (job ledger positions, aligned with the recipients) is
+    narrowed along with them.
+    """
+    payload = body.get("payload", {})
+    recipients = payload.get(recipients_key, [])
+    failed = [index for index, result in enumerate(results[:len(recipients)]) if result.get("status") != "sent"]
+    if not failed:
+        return {"status": HandlerStatus.SUCCESS}
+
+    retry_body = {**body, "payload": {**payload, recipients_key: [recipients[index] for index in failed]}}
+    if body.get("job_positions") is not None:
+        retry_body["job_positions"] = [body["job_positions"][index] for index in failed]
+    return {
+        "status": HandlerStatus.RETRY,
+        "error": f"{len(failed)} of {len(recipients)} recipients failed",
+        "retry_body": retry_body
+    }
+
+
+def batch_handler_results(results: list) -> List[dict]:
+    """Per-message handler results for a batch dispatched as one bulk send, in the same order"""
+    return [
+        {"status": HandlerStatus.SUCCESS} if result.get("status") == "sent"
+        else {"status": HandlerStatus.RETRY, "error": str(result.get("error", "not sent"))}
+        for result in results
+    ]
+
+
+class MessageBatch:
+    """Queue messages collected for one bulk dispatch, each waiting on its own result"""
+
+    def __init__(self):
+        self.entries: List[Tuple[dict, asyncio.Future]] = []  # [(body, future resolved with its handler result)]
+        self.timer: Optional[asyncio.TimerHandle] = None
+
 
 class EventHandler_Service:
     def __init__(self):
@@ -12,6 +64,21 @@ class EventHandler_Service:
         self.consumer_tasks: Dict[str, asyncio.Task] = {}
         self.message_callbacks: Dict[str, Callable[[dict], Any]] = {}
         self.handlers: Dict[str, Dict[str, Callable]] = {}  # {queue_name: {message_type: callback}}
+        self.inflight: Dict[str, Set[asyncio.Task]] = {}  # {queue_name: tasks processing a delivery}
+        self.type_limits: Dict[str, asyncio.Semaphore] = {}  # {message_type: concurrency cap}
+        self.outcomes: Counter = Counter()  # {(message_type, outcome): count}
+        self.depth_task: Optional[asyncio.Task] = None
+        self.dead_letter_hooks: Dict[str, Callable] = {}  # {message_type: async callback(body, reason)}
+        self.batch_handlers: Dict[str, Dict[str, Tuple[Callable, Callable]]] = {}  # {queue_name: {message_type: (callback, key)}}
+        self.batches: Dict[tuple, MessageBatch] = {}  # {(queue_name, message_type, batch key): open batch}
+        self.batch_tasks: Set[asyncio.Task] = set()
+        self.publish_channels: List[Channel] = []  # confirm-mode channels, separate from consumer channels
+        self.publish_channel_cycle = None
+        self.publish_lock = asyncio.Lock()
+        self.declared_queues: Set[str] = set()
+        self.broadcast_handlers: Dict[str, Callable] = {}  # {message_type: async callback(body)}, run in every process
+        self.broadcast_channel: Optional[Channel] = None
+        self.broadcast_task: Optional[asyncio.Task] = None
         self.is_consuming = True  # Default to True
 
     def set_message_callback(self, callback: Callable[[dict], Any], queue_name: str = None):
@@ -20,17 +87,62 @@ class EventHandler_Service:
         self.message_callbacks[queue] = callback
         logging.info(f"✅ Callback registered for queue: {queue}")
 
+    @staticmethod
+    def priority_class_of(body: dict) -> Optional[str]:
+        """A message's priority_class, else the highest QUEUE_PRIORITY_CLASSES class its priority reaches (10 -> otp)"""
+        if body.get('priority_class'):
+            return body['priority_class']
+        if body.get('priority') is None:
+            return None
+        reached = [(value, name) for name, value in settings.queue_priority_classes.items() if value <= int(body['priority'])]
+        return max(reached)[1] if reached else None
+
+    def queue_for(self, body: dict) -> str:
+        """Queue a message is routed to: its 'type.priority_class' route, its type's route, else the shared queue"""
+        message_type = body.get('type')
+        priority_class = self.priority_class_of(body)
+        routes = settings.queue_routes
+        if priority_class and f"{message_type}.{priority_class}" in routes:
+            return routes[f"{message_type}.{priority_class}"]
+        return routes.get(message_type, self.queue_name)
+
+    def routed_queues(self, message_type: str) -> List[str]:
+        """Every queue that can carry a message type: the shared queue plus its routes"""
+        queues = [self.queue_name]
+        for route, queue in settings.queue_routes.items():
+            if (route == message_type or route.startswith(f"{message_type}.")) and queue not in queues:
+                queues.append(queue)
+        return queues
+
     async def register_handler(self, message_type: str, callback: Callable, queue_name: str = None):
-        """Register handler for specific message type and queue"""
-        queue = queue_name or self.queue_name
-        
-        if queue not in self.handlers:
-            self.handlers[queue] = {}
-        
-        self.handlers[queue][message_type] = callback
-        # logging.info(f"✅ Handler registered for '{message_type}' in queue '{queue}'")
+        """Register handler for a message type on one queue, or on every queue routed for it"""
+        for queue in [queue_name] if queue_name else self.routed_queues(message_type):
+            if queue not in self.handlers:
+                self.handlers[queue] = {}
+            
+            self.handlers[queue][message_type] = callback
+            # logging.info(f"✅ Handler registered for '{message_type}' in queue '{queue}'")
+
+    async def register_batch_handler(self, message_type: str, callback: Callable, key: Callable[[dict], Optional[Hashable]],
+                                     queue_name: str = None):
+        """Register a bulk handler used when queue batching is enabled
 
-    async def connect_rabbitmq(self, app):
+        key(body) groups messages that can share one bulk call (same provider, same content) and
+        returns None for messages that must go through the regular handler. callback(bodies)
+        returns one handler result per body, in order.
+        """
+        for queue in [queue_name] if queue_name else self.routed_queues(message_type):
+            self.batch_handlers.setdefault(queue, {})[message_type] = (callback, key)
+
+    async def register_dead_letter_hook(self, message_type: str, callback: Callable):
+        """Call callback(body, reason) whenever a message of this type is parked on a DLQ"""
+        self.dead_letter_hooks[message_type] = callback
+
+    async def register_broadcast_handler(self, message_type: str, callback: Callable):
+        """Call callback(body) in every API and worker process whenever a message of this type is broadcast"""
+        self.broadcast_handlers[message_type] = callback
+
+    async def connect_rabbitmq(self, app=None):
         """Connect to RabbitMQ"""
         try:
             self.connection = await connect_robust(
@@ -41,7 +153,8 @@ class EventHandler_Service:
                 virtualhost="/",
                 timeout=30
             )
-            app.state.rabbit_connection = self.connection
+            if app is not None:
+                app.state.rabbit_connection = self.connection
             logging.info("✅ Connected to RabbitMQ")
             
         except Exception as e:
@@ -49,34 +162,107 @@ class EventHandler_Service:
             self.connection = None
             raise
 
-    async def setup_consumers(self, app):
+    async def setup_consumers(self, app=None):
         """Setup and start consumers - Call this AFTER registering handlers"""
         if not self.connection:
             logging.error("No RabbitMQ connection available")
             return
 
-        # Setup main queue consumer
-        await self.setup_queue_consumer(
-            queue_name=self.queue_name,
-            app=app
-        )
-        # logging.info(f"✅ Started consumer for queue: {self.queue_name}")
+        # One consumer per queue with handlers: the shared queue plus any per-type queues
+        for queue_name in [self.queue_name, *[queue for queue in self.handlers if queue != self.queue_name]]:
+            await self.setup_queue_consumer(
+                queue_name=queue_name,
+                app=app,
+                prefetch_count=settings.queue_prefetch.get(queue_name),
+                concurrency=settings.queue_concurrency.get(queue_name)
+            )
+            # logging.info(f"✅ Started consumer for queue: {queue_name}")
+
+        if settings.queue_depth_poll_interval:
+            self.depth_task = asyncio.create_task(self.poll_queue_depths(), name="queue-depth-poller")
 
-    async def setup_queue_consumer(self, queue_name: str, app, prefetch_count: int = 25):
+    async def setup_broadcast_consumer(self):
+        """Consume the broadcast exchange on a queue of this process's own
+
+        A work queue hands each message to one consumer; broadcasts (such as cache invalidations)
+        must reach every process, so each binds an exclusive, auto-deleted queue to a fanout exchange.
+        """
+        if not self.connection or not self.broadcast_handlers:
+            return
+        channel = await self.connection.channel()
+        exchange = await channel.declare_exchange(settings.queue_broadcast_exchange, ExchangeType.FANOUT, durable=True)
+        queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+        await queue.bind(exchange)
+        self.broadcast_channel = channel
+        self.broadcast_task = asyncio.create_task(self.consume_broadcasts(queue), name="consumer-broadcast")
+
+    async def consume_broadcasts(self, queue):
+        """Run the broadcast handler of every message; broadcasts are not retried or dead-lettered"""
+        try:
+            async with queue.iterator(no_ack=True) as queue_iter:
+                async for message in queue_iter:
+                    try:
+                        body = serializer.loads(message.body)
+                        handler = self.broadcast_handlers.get(body.get('type'))
+                        if handler is None:
+                            logging.warning(f"⚠️ No broadcast handler for message type '{body.get('type')}'")
+                            continue
+                        await handler(body)
+                    except Exception as e:
+                        logging.error(f"❌ Broadcast handler failed: {e}")
+        except asyncio.CancelledError:
+            logging.info("🛑 Broadcast consumer cancelled")
+
+    async def poll_queue_depths(self):
+        """Export ready-message and consumer counts of every consumed queue (and its retry tiers and DLQ)
+
+        Uses passive declares on a channel of its own: a failed passive declare closes its
+        channel, which must not take a consumer down with it.
+        """
+        channel = None
+        while self.is_consuming:
+            try:
+                if channel is None or channel.is_closed:
+                    channel = await self.connection.channel()
+                for queue_name in list(self.consumer_tasks):
+                    names = [
+                        queue_name,
+                        *[self.retry_queue_name(queue_name, delay) for delay in settings.queue_retry_delays],
+                        self.dead_letter_queue_name(queue_name)
+                    ]
+                    for name in names:
+                        queue = await channel.declare_queue(name, passive=True)
+                        QUEUE_DEPTH.labels(queue=name).set(queue.declaration_result.message_count)
+                        QUEUE_CONSUMERS.labels(queue=name).set(queue.declaration_result.consumer_count)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logging.warning(f"⚠️ Queue depth poll failed: {e}")
+                channel = None
+            try:
+                await asyncio.sleep(settings.queue_depth_poll_interval)
+            except asyncio.CancelledError:
+                break
+        if channel is not None and not channel.is_closed:
+            await channel.close()
+
+    async def setup_queue_consumer(self, queue_name: str, app=None, prefetch_count: int = None, concurrency: int = None):
         """Setup consumer for a specific queue"""
+        prefetch_count = prefetch_count or settings.queue_prefetch_count
+        concurrency = concurrency or prefetch_count
         try:
             # Create channel for this queue
             channel = await self.connection.channel()
             await channel.set_qos(prefetch_count=prefetch_count)
             
+            # Retry tiers and the DLQ first, so drop-head overflow has somewhere to dead-letter to
+            await self.declare_retry_topology(channel, queue_name)
+            
             # Declare queue (MUST match what publisher uses)
             queue = await channel.declare_queue(
                 queue_name,
                 durable=True,
-                arguments={
-                    'x-queue-type': 'classic',
-                    # 'x-max-length': 100000  # Prevent memory overflow
-                }
+                arguments=self.queue_arguments(queue_name)
             )
             
             # Store channel
@@ -84,7 +270,7 @@ class EventHandler_Service:
             
             # Create and store consumer task
             self.consumer_tasks[queue_name] = asyncio.create_task(
-                self.consume_queue(queue_name, queue),
+                self.consume_queue(queue_name, queue, concurrency=concurrency),
                 name=f"consumer-{queue_name}"
             )
             
@@ -94,9 +280,138 @@ class EventHandler_Service:
             logging.error(f"❌ Failed to setup consumer for '{queue_name}': {e}")
             raise
 
-    async def consume_queue(self, queue_name: str, queue):
-        """Consume messages from a specific queue"""
+    def queue_arguments(self, queue_name: str) -> dict:
+        """Declare arguments of a notification queue, shared by consumers and publishers
+
+        Only the arguments the configured queue type supports are set: priorities and lazy mode
+        are classic-only.
+        """
+        queue_type = settings.queue_type
+        arguments = {'x-queue-type': queue_type}
+        if settings.queue_max_priority and queue_type == 'classic':
+            arguments['x-max-priority'] = settings.queue_max_priority
+        if settings.queue_lazy_mode and queue_type == 'classic':
+            arguments['x-queue-mode'] = 'lazy'
+        if settings.queue_max_length_bytes:
+            arguments['x-max-length-bytes'] = settings.queue_max_length_bytes
+
+        if settings.queue_max_length or settings.queue_max_length_bytes:
+            if settings.queue_max_length:
+                arguments['x-max-length'] = settings.queue_max_length
+            # reject-publish nacks new publishes while full (send_message returns False);
+            # drop-head makes room by dead-lettering the oldest message to the DLQ
+            arguments['x-overflow'] = settings.queue_overflow
+            if settings.queue_overflow == 'drop-head':
+                arguments['x-dead-letter-exchange'] = ''
+                arguments['x-dead-letter-routing-key'] = self.dead_letter_queue_name(queue_name)
+        return arguments
+
+    @staticmethod
+    def message_priority(body: dict) -> Optional[int]:
+        """Priority of an outgoing message: its 'priority', else its priority_class's, clamped to the queue maximum"""
+        if not settings.queue_max_priority:
+            return None
+        priority = body.get('priority')
+        if priority is None:
+            priority = settings.queue_priority_classes.get(body.get('priority_class'), 0)
+        return max(0, min(int(priority), settings.queue_max_priority))
+
+    @staticmethod
+    def retry_queue_name(queue_name: str, delay: int) -> str:
+        return f"{queue_name}.retry.{delay}s"
+
+    @staticmethod
+    def dead_letter_queue_name(queue_name: str) -> str:
+        return f"{queue_name}.dlq"
+
+    async def declare_retry_topology(self, channel: Channel, queue_name: str):
+        """Declare the delayed-retry tiers and the terminal DLQ for a queue
+
+        Each tier is a consumer-less queue whose messages expire after the tier's delay and are
+        then dead-lettered back onto the main queue, giving exponential backoff without timers.
+        """
+        for delay in settings.queue_retry_delays:
+            await channel.declare_queue(
+                self.retry_queue_name(queue_name, delay),
+                durable=True,
+                arguments={
+                    'x-message-ttl': delay * 1000,
+                    'x-dead-letter-exchange': '',
+                    'x-dead-letter-routing-key': queue_name,
+                }
+            )
+        await channel.declare_queue(self.dead_letter_queue_name(queue_name), durable=True)
+
+    async def republish(self, message: IncomingMessage, queue_name: str, routing_key: str, headers: dict, body: dict = None):
+        """Publish a copy of a delivery (same or replacement body, extra headers) on the consumer's channel"""
+        await self.channels[queue_name].default_exchange.publish(
+            Message(
+                body=message.body if body is None else serializer.dumps(body),
+                delivery_mode=2,  # Persistent
+                content_type=message.content_type or 'application/json',
+                priority=message.priority,
+                type=message.type,
+                headers={**(message.headers or {}), **headers}
+            ),
+            routing_key=routing_key
+        )
+
+    async def retry_or_dead_letter(self, message: IncomingMessage, queue_name: str, retry_count: int, error: str,
+                                   body: dict = None, message_type: str = None):
+        """Schedule a delayed retry, or park the message on the DLQ once retries are exhausted"""
+        delays = settings.queue_retry_delays
+        if retry_count < settings.queue_max_retries and delays:
+            delay = delays[min(retry_count, len(delays) - 1)]
+            await self.republish(message, queue_name, self.retry_queue_name(queue_name, delay), {
+                'x-retry-count': retry_count + 1,
+                'x-last-error': error[:500],
+            }, body)
+            self.record_outcome(queue_name, message_type, "retried")
+            logging.warning(f"🔁 Retry {retry_count + 1}/{settings.queue_max_retries} for message from {queue_name} in {delay}s")
+        else:
+            await self.dead_letter(message, queue_name, f"max retries ({settings.queue_max_retries}) exceeded: {error}", body, message_type)
+
+    async def dead_letter(self, message: IncomingMessage, queue_name: str, reason: str,
+                          body: dict = None, message_type: str = None):
+        await self.republish(message, queue_name, self.dead_letter_queue_name(queue_name), {
+            'x-dead-letter-reason': reason[:500],
+            'x-dead-lettered-at': datetime.utcnow().isoformat(),
+        }, body)
+        self.record_outcome(queue_name, message_type, "dead_lettered")
+        logging.error(f"❌ Message from {queue_name} sent to DLQ: {reason}")
+
+        hook = self.dead_letter_hooks.get(message_type)
+        if hook is not None:
+            try:
+                await hook(serializer.loads(message.body) if body is None else body, reason)
+            except Exception as e:
+                logging.error(f"❌ Dead-letter hook failed for '{message_type}': {e}")
+
+    def metric_type(self, queue_name: str, message_type: Optional[str]) -> str:
+        """Message type as a metric label; types without a handler collapse into 'unknown'"""
+        return message_type if message_type in self.handlers.get(queue_name, {}) else "unknown"
+
+    def record_outcome(self, queue_name: str, message_type: Optional[str], outcome: str):
+        self.outcomes[(message_type, outcome)] += 1
+        MESSAGE_OUTCOMES.labels(queue=queue_name, type=self.metric_type(queue_name, message_type), outcome=outcome).inc()
+
+    async def route_result(self, message: IncomingMessage, queue_name: str, message_type: str, retry_count: int, result: Any):
+        """Ack, retry or dead-letter a delivery according to its handler's HandlerStatus"""
+        status = result.get("status") if isinstance(result, dict) else None
+        error = str(result.get("error", "")) if isinstance(result, dict) else ""
+        if status == HandlerStatus.RETRY:
+            await self.retry_or_dead_letter(message, queue_name, retry_count, error, result.get("retry_body"), message_type)
+        elif status == HandlerStatus.FAILED:
+            await self.dead_letter(message, queue_name, f"permanent failure: {error}", result.get("retry_body"), message_type)
+        else:
+            self.record_outcome(queue_name, message_type, "acked")
+            logging.info(f"✅ Successfully processed '{message_type}': {result}")
+
+    async def consume_queue(self, queue_name: str, queue, concurrency: int = 1):
+        """Consume messages from a specific queue, processing up to `concurrency` of them at once"""
         logging.info(f"🎯 Starting to consume from queue: {queue_name}")
+        slots = asyncio.Semaphore(concurrency)
+        inflight = self.inflight.setdefault(queue_name, set())
         
         try:
             async with queue.iterator() as queue_iter:
@@ -104,87 +419,193 @@ class EventHandler_Service:
                     if not self.is_consuming:
                         break
                     
-                    await self.process_incoming_message(message, queue_name)
+                    await slots.acquire()
+                    MESSAGES_IN_FLIGHT.labels(queue=queue_name).inc()
+                    task = asyncio.create_task(self._process_in_slot(message, queue_name, slots))
+                    inflight.add(task)
+                    task.add_done_callback(inflight.discard)
                     
         except asyncio.CancelledError:
             logging.info(f"🛑 Consumer cancelled for queue: {queue_name}")
         except Exception as e:
             logging.error(f"❌ Consumer error for {queue_name}: {e}")
 
+    async def _process_in_slot(self, message: IncomingMessage, queue_name: str, slots: asyncio.Semaphore):
+        try:
+            await self.process_incoming_message(message, queue_name)
+        finally:
+            MESSAGES_IN_FLIGHT.labels(queue=queue_name).dec()
+            slots.release()
+
+    def _batch_key(self, queue_name: str, message_type: str, body: dict) -> Optional[tuple]:
+        if not settings.queue_batching_enabled:
+            return None
+        batch_handler = self.batch_handlers.get(queue_name, {}).get(message_type)
+        if batch_handler is None:
+            return None
+        key = batch_handler[1](body)
+        return None if key is None else (queue_name, message_type, key)
+
+    async def add_to_batch(self, batch_key: tuple, body: dict) -> Any:
+        """Queue a message on its open batch and wait for the batch's result for it"""
+        loop = asyncio.get_running_loop()
+        batch = self.batches.get(batch_key)
+        if batch is None:
+            batch = self.batches[batch_key] = MessageBatch()
+            batch.timer = loop.call_later(settings.queue_batch_window_ms / 1000, self.flush_batch, batch_key)
+
+        future = loop.create_future()
+        batch.entries.append((body, future))
+        if len(batch.entries) >= settings.queue_batch_max_size:
+            self.flush_batch(batch_key)
+        return await future
+
+    def flush_batch(self, batch_key: tuple):
+        """Close a batch and dispatch it in the background"""
+        batch = self.batches.pop(batch_key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = asyncio.create_task(self._dispatch_batch(batch_key, batch))
+        self.batch_tasks.add(task)
+        task.add_done_callback(self.batch_tasks.discard)
+
+    async def _dispatch_batch(self, batch_key: tuple, batch: MessageBatch):
+        queue_name, message_type, _ = batch_key
+        callback = self.batch_handlers[queue_name][message_type][0]
+        bodies = [body for body, _ in batch.entries]
+        type_limit = self._type_limit(message_type)
+        try:
+            if type_limit is None:
+                results = await callback(bodies)
+            else:
+                async with type_limit:
+                    results = await callback(bodies)
+            if len(results) != len(bodies):
+                raise ValueError(f"batch handler returned {len(results)} results for {len(bodies)} messages")
+        except Exception as e:
+            logging.error(f"❌ Batch handler failed for '{message_type}' ({len(bodies)} messages): {e}")
+            results = [{"status": HandlerStatus.RETRY, "error": str(e)}] * len(bodies)
+
+        logging.info(f"📦 Dispatched batch of {len(bodies)} '{message_type}' messages from {queue_name}")
+        for (_, future), result in zip(batch.entries, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _type_limit(self, message_type: str) -> Optional[asyncio.Semaphore]:
+        """Per-message-type concurrency cap shared by every queue, None when uncapped"""
+        if message_type not in self.type_limits:
+            limit = settings.consumer_type_concurrency.get(message_type)
+            self.type_limits[message_type] = asyncio.Semaphore(limit) if limit else None
+        return self.type_limits[message_type]
+
     async def process_incoming_message(self, message: IncomingMessage, queue_name: str):
         """Process incoming message with retry limits"""
-        MAX_RETRIES = 3
-        
         try:
-            # Parse message
-            body = json.loads(message.body.decode())
-            
             # Check retry count from headers
             retry_count = 0
             if message.headers and 'x-retry-count' in message.headers:
-                retry_count = message.headers['x-retry-count']
-            
-            # Check for handler by message type
-            message_type = body.get('type')
-            queue_handlers = self.handlers.get(queue_name, {})
-            
-            if message_type in queue_handlers:
-                handler = queue_handlers[message_type]
+                retry_count = int(message.headers['x-retry-count'])
+
+            # requeue=True: if routing to retry/DLQ itself fails, the broker keeps the message
+            async with message.process(requeue=True):
+                try:
+                    # Parse message
+                    body = serializer.loads(message.body)
+                except serializer.DECODE_ERRORS as e:
+                    MESSAGES_CONSUMED.labels(queue=queue_name, type=self.metric_type(queue_name, message.type)).inc()
+                    logging.error(f"❌ Invalid message in {queue_name}: {e}")
+                    await self.dead_letter(message, queue_name, f"invalid message: {e}", message_type=message.type)
+                    return
                 
-                async with message.process():
-                    try:
-                        # Execute handler
+                # Check for handler by message type
+                message_type = body.get('type')
+                queue_handlers = self.handlers.get(queue_name, {})
+                MESSAGES_CONSUMED.labels(queue=queue_name, type=self.metric_type(queue_name, message_type)).inc()
+                
+                if message_type not in queue_handlers:
+                    # No handler found
+                    logging.warning(f"⚠️ No handler for message type '{message_type}' in queue '{queue_name}'")
+                    await self.dead_letter(message, queue_name, f"no handler for message type '{message_type}'", message_type=message_type)
+                    return
+
+                handler = queue_handlers[message_type]
+                type_limit = self._type_limit(message_type)
+                # Urgent messages (OTPs) are sent straight away rather than waiting out a batch window
+                urgent = (message.priority or 0) >= settings.queue_urgent_priority
+                batch_key = None if urgent else self._batch_key(queue_name, message_type, body)
+                started = time.perf_counter()
+                try:
+                    # Execute handler
+                    if batch_key is not None:
+                        # The type limit is taken once per batch, not per message
+                        result = await self.add_to_batch(batch_key, body)
+                    elif type_limit is None:
                         result = await handler(body)
-                        logging.info(f"✅ Successfully processed '{message_type}': {result}")
-                    except Exception as e:
-                        logging.error(f"❌ Handler failed for '{message_type}': {e}")
-                        # Only requeue if under retry limit
-                        if retry_count < MAX_RETRIES:
-                            await message.reject(requeue=True)
-                        else:
-                            # Max retries exceeded - discard message
-                            logging.error(f"❌ Message '{message_type}' exceeded max retries ({MAX_RETRIES}), discarding")
-                            await message.reject(requeue=False)
-            else:
-                # No handler found
-                logging.warning(f"⚠️ No handler for message type '{message_type}' in queue '{queue_name}'")
-                await message.reject(requeue=False)  # Discard or send to DLQ
+                    else:
+                        async with type_limit:
+                            result = await handler(body)
+                except Exception as e:
+                    logging.error(f"❌ Handler failed for '{message_type}': {e}")
+                    result = {"status": HandlerStatus.RETRY, "error": str(e)}
+                HANDLER_DURATION.labels(queue=queue_name, type=message_type).observe(time.perf_counter() - started)
+                await self.route_result(message, queue_name, message_type, retry_count, result)
                 
-        except json.JSONDecodeError:
-            logging.error(f"❌ Invalid JSON in message from {queue_name}")
-            await message.reject(requeue=False)
         except Exception as e:
             logging.error(f"❌ Failed to process message from {queue_name}: {e}")
-            await message.reject(requeue=True)
+
+    async def publish_channel(self) -> Channel:
+        """Next channel from the publish pool (round robin), opening the pool on first use"""
+        if not self.publish_channels:
+            async with self.publish_lock:
+                if not self.publish_channels:
+                    channels = [
+                        await self.connection.channel(publisher_confirms=True, on_return_raises=True)
+                        for _ in range(max(settings.publish_channel_pool_size, 1))
+                    ]
+                    self.publish_channel_cycle = itertools.cycle(channels)
+                    self.publish_channels = channels
+        return next(self.publish_channel_cycle)
+
+    async def ensure_queue(self, queue_name: str):
+        """Declare a queue, with its retry tiers and DLQ, the first time something is published to it
+
+        The publisher may declare a queue before any consumer does; with drop-head overflow its
+        DLQ must exist by then, or the oldest messages are dropped instead of dead-lettered.
+        """
+        if queue_name in self.declared_queues:
+            return
+        channel = await self.publish_channel()
+        await self.declare_retry_topology(channel, queue_name)
+        await channel.declare_queue(queue_name, durable=True, arguments=self.queue_arguments(queue_name))
+        self.declared_queues.add(queue_name)
+
+    @classmethod
+    def build_message(cls, body: dict) -> Message:
+        return Message(
+            body=serializer.dumps(body),
+            delivery_mode=2,  # Persistent
+            priority=cls.message_priority(body),
+            type=body.get('type'),
+            content_type='application/json',
+            headers={
+                'sent_at': datetime.utcnow().isoformat(),
+                'source': 'adapterapi'
+            }
+        )
 
     async def send_message(self, body: dict, queue_name: str = None, routing_key: str = None):
-        """Send message to queue"""
-        target_queue = queue_name or self.queue_name
+        """Send message to queue (its routed queue by default); True once the broker has confirmed it"""
+        target_queue = queue_name or self.queue_for(body)
         target_routing = routing_key or target_queue
         
         try:
-            # Ensure we have a channel for this queue
-            if target_queue not in self.channels:
-                channel = await self.connection.channel()
-                await channel.declare_queue(target_queue, durable=True)
-                self.channels[target_queue] = channel
-            
-            channel = self.channels[target_queue]
+            await self.ensure_queue(target_queue)
+            channel = await self.publish_channel()
             
-            # Create message
-            message = Message(
-                body=json.dumps(body).encode(),
-                delivery_mode=2,  # Persistent
-                content_type='application/json',
-                headers={
-                    'sent_at': datetime.utcnow().isoformat(),
-                    'source': 'adapterapi'
-                }
-            )
-            
-            # Publish
+            # Publish and wait for the broker's confirm
             await channel.default_exchange.publish(
-                message,
+                self.build_message(body),
                 routing_key=target_routing
             )
             
@@ -195,11 +616,73 @@ class EventHandler_Service:
             logging.error(f"❌ Failed to send message to {target_queue}: {e}")
             return False
 
+    async def broadcast(self, body: dict) -> bool:
+        """Publish a message to every process's broadcast queue; True once the broker has confirmed it"""
+        try:
+            channel = await self.publish_channel()
+            exchange = await channel.declare_exchange(settings.queue_broadcast_exchange, ExchangeType.FANOUT, durable=True)
+            await exchange.publish(
+                Message(body=serializer.dumps(body), type=body.get('type'), content_type='application/json'),
+                routing_key=''
+            )
+            logging.info(f"📣 Broadcast {body.get('type', 'unknown')}")
+            return True
+        except Exception as e:
+            logging.error(f"❌ Failed to broadcast {body.get('type', 'unknown')}: {e}")
+            return False
+
+    async def send_many(self, bodies: Iterable[dict], queue_name: str = None, routing_key: str = None) -> List[bool]:
+        """Publish a batch of messages with pipelined publisher confirms
+
+        Every message is encoded once and published without waiting for the previous one's
+        confirm; confirms are awaited together (at most `publish_max_unconfirmed` outstanding),
+        spread over the publish channel pool. Without a queue_name each message goes to its
+        routed queue. Returns, per message in order, whether the broker confirmed it.
+        """
+        bodies = list(bodies)
+        if not bodies:
+            return []
+        targets = [queue_name or self.queue_for(body) for body in bodies]
+
+        unreachable = set()
+        for target_queue in set(targets):
+            try:
+                await self.ensure_queue(target_queue)
+            except Exception as e:
+                logging.error(f"❌ Failed to declare {target_queue}: {e}")
+                unreachable.add(target_queue)
+
+        unconfirmed = asyncio.Semaphore(settings.publish_max_unconfirmed)
+
+        async def publish(body: dict, target_queue: str):
+            if target_queue in unreachable:
+                raise RuntimeError(f"queue {target_queue} unavailable")
+            async with unconfirmed:
+                channel = await self.publish_channel()
+                await channel.default_exchange.publish(self.build_message(body), routing_key=routing_key or target_queue)
+
+        results = await asyncio.gather(
+            *[publish(body, target_queue) for body, target_queue in zip(bodies, targets)],
+            return_exceptions=True
+        )
+        confirmed = [not isinstance(result, BaseException) for result in results]
+        failed = len(confirmed) - sum(confirmed)
+        if failed:
+            errors = {str(result) for result in results if isinstance(result, BaseException)}
+            logging.error(f"❌ {failed} of {len(bodies)} messages were not confirmed: {'; '.join(errors)}")
+        logging.info(f"📨 Sent {len(bodies) - failed} messages to {', '.join(sorted(set(targets)))}")
+        return confirmed
+
     async def stop_all(self):
-        """Stop all consumers and close connection"""
+        """Stop all consumers, drain in-flight messages and close connection"""
         self.is_consuming = False
         
-        # Cancel all consumer tasks
+        for task in (self.depth_task, self.broadcast_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        
+        # Cancel all consumer tasks so no new deliveries are taken
         for queue_name, task in self.consumer_tasks.items():
             task.cancel()
             try:
@@ -208,9 +691,26 @@ class EventHandler_Service:
                 pass
             logging.info(f"🛑 Stopped consumer for: {queue_name}")
         
+        # Dispatch partially filled batches now rather than waiting out their window
+        for batch_key in list(self.batches):
+            self.flush_batch(batch_key)
+        
+        # Let messages already being handled finish and ack before their channels close;
+        # anything still running after the timeout is cancelled and redelivered by the broker
+        pending = [task for tasks in self.inflight.values() for task in tasks]
+        if pending:
+            logging.info(f"⏳ Draining {len(pending)} in-flight message(s)")
+            _, unfinished = await asyncio.wait(pending, timeout=settings.consumer_drain_timeout)
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                await asyncio.wait(unfinished)
+                logging.warning(f"⚠️ {len(unfinished)} message(s) did not finish draining and will be redelivered")
+        
         # Close channels
-        for channel in self.channels.values():
-            await channel.close()
+        for channel in [*self.channels.values(), *self.publish_channels, self.broadcast_channel]:
+            if channel is not None:
+                await channel.close()
         
         # Close connection
         if self.connection:
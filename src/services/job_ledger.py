@@ -0,0 +1,277 @@
+"""
+Job Ledger - batched persistence of notification jobs and per-recipient results
+"""
+import asyncio, uuid
+from datetime import datetime
+from typing import List, Optional, Sequence
+from sqlalchemy import case, func, insert, select, update
+from src.core import settings, logging
+from src.core.dbconfig import async_session
+from src.models import NotificationJob, JobRecipient
+
+
+class JobLedger:
+    """Records jobs up front and buffers recipient results, writing them in batches
+
+    Results are flushed every `flush_interval` seconds or once `batch_size` of them are buffered:
+    one bulk UPDATE for the recipient rows plus one counter UPDATE per job, instead of a write
+    per recipient. A recipient's first recorded result wins and the counters are recounted from
+    the rows, so at-least-once redeliveries do not inflate them.
+    """
+
+    def __init__(self, session_factory=None, batch_size: int = None, flush_interval: float = None):
+        self.session_factory = session_factory or async_session
+        self.batch_size = batch_size or settings.job_ledger_batch_size
+        self.flush_interval = flush_interval or settings.job_ledger_flush_interval
+        self.buffer: List[dict] = []
+        self.flush_lock = asyncio.Lock()
+        self.wakeup = asyncio.Event()
+        self.flusher: Optional[asyncio.Task] = None
+
+    async def create_job(self, channel: str, provider: str, recipients: Sequence[str], is_bulk: bool = True,
+                         duplicates: int = 0, with_recipients: bool = True) -> str:
+        """Persist a job and a pending row per (deduplicated) recipient; returns the job id
+
+        Without with_recipients only the job header is written; insert_recipients adds the rows later.
+        """
+        job_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            session.add(NotificationJob(
+                id=job_id, channel=channel, provider=provider, is_bulk=is_bulk, status="queued",
+                total=len(recipients), sent=0, failed=0, duplicates=duplicates, created_at=now, updated_at=now
+            ))
+            if with_recipients:
+                await session.flush()
+                await self._insert_rows(session, job_id, 0, recipients)
+            await session.commit()
+        return job_id
+
+    async def insert_recipients(self, job_id: str, recipients: Sequence[str]) -> bool:
+        """Add the rows of a job created without them; False when they already exist (a redelivery)"""
+        async with self.session_factory() as session:
+            existing = await session.scalar(
+                select(func.count()).select_from(JobRecipient).where(JobRecipient.job_id == job_id)
+            )
+            if existing:
+                return False
+            await self._insert_rows(session, job_id, 0, recipients)
+            await session.commit()
+        return True
+
+    @staticmethod
+    async def _insert_rows(session, job_id: str, offset: int, recipients: Sequence[str]):
+        for start in range(0, len(recipients), settings.job_ledger_insert_chunk_size):
+            chunk = recipients[start:start + settings.job_ledger_insert_chunk_size]
+            await session.execute(insert(JobRecipient), [
+                {"job_id": job_id, "position": offset + start + index, "recipient": str(recipient), "status": "pending"}
+                for index, recipient in enumerate(chunk)
+            ])
+
+    async def open_job(self, channel: str, provider: str) -> str:
+        """Persist an empty job whose recipients are added as an upload streams in"""
+        job_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            session.add(NotificationJob(
+                id=job_id, channel=channel, provider=provider, is_bulk=True, status="receiving",
+                total=0, sent=0, failed=0, duplicates=0, created_at=now, updated_at=now
+            ))
+            await session.commit()
+        return job_id
+
+    async def add_recipients(self, job_id: str, offset: int, recipients: Sequence[str]):
+        """Add recipients offset..offset+len(recipients) to a receiving job"""
+        async with self.session_factory() as session:
+            await self._insert_rows(session, job_id, offset, recipients)
+            await session.execute(
+                update(NotificationJob)
+                .where(NotificationJob.id == job_id)
+                .values(total=NotificationJob.total + len(recipients), updated_at=datetime.utcnow())
+            )
+            await session.commit()
+
+    async def close_job(self, job_id: str, duplicates: int = 0):
+        """The upload has ended: record its dropped duplicates and settle the job's status on the results so far"""
+        async with self.session_factory() as session:
+            await session.execute(
+                update(NotificationJob)
+                .where(NotificationJob.id == job_id)
+                .values(
+                    duplicates=duplicates,
+                    updated_at=datetime.utcnow(),
+                    status=case(
+                        (NotificationJob.total == 0, "failed"),
+                        else_=self._status(NotificationJob.sent, NotificationJob.failed)
+                    )
+                )
+            )
+            await session.commit()
+
+    async def fail_job(self, job_id: str, error: str):
+        """Give up on a job: every recipient without a result counts as failed, recorded rows or not"""
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            await session.execute(
+                update(JobRecipient)
+                .where(JobRecipient.job_id == job_id, JobRecipient.status == "pending")
+                .values(status="failed", error=error[:1000], updated_at=now),
+                execution_options={"synchronize_session": None}
+            )
+            await session.execute(
+                update(NotificationJob)
+                .where(NotificationJob.id == job_id)
+                .values(
+                    failed=NotificationJob.total - NotificationJob.sent,
+                    updated_at=now,
+                    status=case((NotificationJob.sent == 0, "failed"), else_="completed_with_errors")
+                )
+            )
+            await session.commit()
+
+    async def mark_running(self, job_id: str):
+        async with self.session_factory() as session:
+            await session.execute(
+                update(NotificationJob)
+                .where(NotificationJob.id == job_id, NotificationJob.status == "queued")
+                .values(status="running", updated_at=datetime.utcnow())
+            )
+            await session.commit()
+
+    def record(self, job_id: str, offset: int, results: Sequence[dict]):
+        """Buffer the results of recipients offset..offset+len(results) of a job"""
+        now = datetime.utcnow()
+        for index, result in enumerate(results):
+            sent = result.get("status") == "sent"
+            self.buffer.append({
+                "job_id": job_id,
+                "position": offset + index,
+                "status": "sent" if sent else "failed",
+                "message_id": None if result.get("message_id") is None else str(result.get("message_id")),
+                "error": None if sent else str(result.get("error", "not sent"))[:1000],
+                "updated_at": now,
+            })
+        if len(self.buffer) >= self.batch_size:
+            self.wakeup.set()
+
+    async def flush(self):
+        """Write every buffered result"""
+        async with self.flush_lock:
+            if not self.buffer:
+                return
+            rows, self.buffer = self.buffer, []
+            job_ids = {row["job_id"] for row in rows}
+
+            try:
+                async with self.session_factory() as session:
+                    # ORM bulk UPDATE by primary key (job_id, position): one executemany. Only pending
+                    # rows change, so a redelivered message cannot overwrite a recorded result.
+                    await session.execute(
+                        update(JobRecipient).where(JobRecipient.status == "pending"),
+                        rows,
+                        execution_options={"synchronize_session": None}
+                    )
+                    for job_id in job_ids:
+                        await session.execute(self._progress(job_id))
+                    await session.commit()
+            except Exception as e:
+                logging.error(f"Failed to write {len(rows)} job results, will retry: {str(e)}")
+                self.buffer = rows + self.buffer
+
+    @staticmethod
+    def _status(sent, failed):
+        return case(
+            (sent + failed < NotificationJob.total, "running"),
+            (failed == 0, "completed"),
+            (sent == 0, "failed"),
+            else_="completed_with_errors"
+        )
+
+    @classmethod
+    def _progress(cls, job_id: str):
+        """Recount a job from its recipient rows, so a result recorded twice is only counted once"""
+        def count(status: str):
+            return (
+                select(func.count())
+                .where(JobRecipient.job_id == job_id, JobRecipient.status == status)
+                .scalar_subquery()
+            )
+
+        sent, failed = count("sent"), count("failed")
+        return (
+            update(NotificationJob)
+            .where(NotificationJob.id == job_id)
+            .values(
+                sent=sent,
+                failed=failed,
+                updated_at=datetime.utcnow(),
+                # An upload still streaming in has no final total yet; close_job settles it
+                status=case(
+                    (NotificationJob.status == "receiving", "receiving"),
+                    else_=cls._status(sent, failed)
+                )
+            )
+        )
+
+    async def get_job(self, job_id: str, recipients: bool = False, limit: int = 100) -> Optional[dict]:
+        """Job progress, optionally with up to `limit` recipient rows (failures first)"""
+        async with self.session_factory() as session:
+            job = await session.get(NotificationJob, job_id)
+            if job is None:
+                return None
+            data = {
+                "job_id": job.id,
+                "channel": job.channel,
+                "provider": job.provider,
+                "is_bulk": job.is_bulk,
+                "status": job.status,
+                "total": job.total,
+                "sent": job.sent,
+                "failed": job.failed,
+                "pending": job.total - job.sent - job.failed,
+                "duplicates_dropped": job.duplicates,
+                "progress": round((job.sent + job.failed) / job.total * 100, 2) if job.total else 100.0,
+                "created_at": job.created_at.isoformat(),
+                "updated_at": job.updated_at.isoformat(),
+            }
+            if recipients:
+                rows = await session.execute(
+                    select(JobRecipient)
+                    .where(JobRecipient.job_id == job_id)
+                    .order_by(case((JobRecipient.status == "failed", 0), else_=1), JobRecipient.position)
+                    .limit(limit)
+                )
+                data["recipients"] = [
+                    {
+                        "recipient": row.recipient,
+                        "status": row.status,
+                        "message_id": row.message_id,
+                        "error": row.error,
+                    }
+                    for row in rows.scalars()
+                ]
+            return data
+
+    async def _run_flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def start(self):
+        if self.flusher is None:
+            self.flusher = asyncio.create_task(self._run_flusher(), name="job-ledger-flusher")
+
+    async def aclose(self):
+        """Stop the flusher and write whatever is still buffered"""
+        if self.flusher is not None:
+            self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
+        await self.flush()
+
+
+job_ledger = JobLedger()
@@ -0,0 +1,70 @@
+"""
+Notification Runtime - start and stop what sending notifications needs
+
+Shared by the two entry points: the API lifespan (src.main) and the queue worker (src.worker).
+"""
+import asyncio
+from functools import partial
+from src.services.event_handler import EventHandler_Service
+from src.services.email_service import EmailServiceFactory
+from src.services.push_service import PushNotificationServiceFactory
+from src.services.sms_service import SMSServiceFactory, sms_http_pool
+from src.services.job_ledger import job_ledger
+from src.repositories.queue_handlers import (
+    job_repo, process_email_message, process_sms_message,
+    process_email_batch, process_sms_batch, email_batch_key, sms_batch_key,
+    process_job_ingest, process_template_invalidation
+)
+
+
+async def start_services():
+    """Open the provider connection pools, the job ledger and the provider registries"""
+    await sms_http_pool.start(SMSServiceFactory._providers.keys())
+    await job_ledger.start()
+    await asyncio.gather(
+        SMSServiceFactory.registry.startup(),
+        EmailServiceFactory.registry.startup(),
+        PushNotificationServiceFactory.registry.startup()
+    )
+
+
+async def register_queue_handlers(eventrouter_handler: EventHandler_Service):
+    """Register the notification handlers, batch handlers and dead-letter hooks on every routed queue"""
+    await asyncio.gather(
+        eventrouter_handler.register_handler('email', process_email_message ),
+        # eventrouter_handler.register_handler('push', process_push_message ),
+        eventrouter_handler.register_handler('sms', process_sms_message ),
+        eventrouter_handler.register_handler('job_ingest', partial(process_job_ingest, publisher=eventrouter_handler) ),
+        eventrouter_handler.register_batch_handler('email', process_email_batch, email_batch_key ),
+        eventrouter_handler.register_batch_handler('sms', process_sms_batch, sms_batch_key ),
+        eventrouter_handler.register_dead_letter_hook('email', job_repo.record_dead_lettered ),
+        eventrouter_handler.register_dead_letter_hook('sms', job_repo.record_dead_lettered ),
+        eventrouter_handler.register_dead_letter_hook('job_ingest', job_repo.fail_dead_lettered_job )
+    )
+
+
+async def start_consumers(eventrouter_handler: EventHandler_Service, app=None):
+    """Register the handlers and start consuming; call after connect_rabbitmq and start_services"""
+    await register_queue_handlers(eventrouter_handler)
+    await eventrouter_handler.setup_consumers(app)
+
+
+async def start_broadcasts(eventrouter_handler: EventHandler_Service):
+    """Consume the broadcasts every process acts on (template cache invalidation), consumers or not"""
+    await eventrouter_handler.register_broadcast_handler('email_template_invalidate', process_template_invalidation)
+    await eventrouter_handler.setup_broadcast_consumer()
+
+
+async def stop_services(eventrouter_handler: EventHandler_Service = None):
+    """Drain the consumers, then close the providers and flush the job ledger"""
+    # Drain consumers first: in-flight messages still need the providers
+    if eventrouter_handler is not None:
+        await eventrouter_handler.stop_all()
+
+    await asyncio.gather(
+        SMSServiceFactory.registry.shutdown(),
+        EmailServiceFactory.registry.shutdown(),
+        PushNotificationServiceFactory.registry.shutdown()
+    )
+    await sms_http_pool.aclose()
+    await job_ledger.aclose()
@@ -0,0 +1,75 @@
+"""
+Provider Registry - long-lived provider instances shared by the service factories
+"""
+import importlib
+from typing import Any, Callable, Dict
+from src.utils.libs.logging import logging
+
+
+def import_provider(path: str) -> type:
+    """Resolve a dotted 'package.module.ClassName' path to a provider class"""
+    module_path, _, class_name = path.rpartition(".")
+    if not module_path:
+        raise ValueError(f"Invalid provider path: {path}")
+    return getattr(importlib.import_module(module_path), class_name)
+
+
+class ProviderRegistry:
+    """Builds each provider once and hands out the same instance on every lookup"""
+
+    def __init__(self, kind: str, providers: Dict[str, Any], build: Callable[[str, type], Any] = None):
+        self.kind = kind
+        self.providers: Dict[str, Any] = {}  # {name: provider class or dotted path}
+        self.instances: Dict[str, Any] = {}
+        self.build = build or (lambda name, provider_class: provider_class())
+        for name, provider in providers.items():
+            self.register(name, provider)
+
+    def register(self, name: str, provider: Any):
+        """Register a provider class, dotted class path or ready-made instance under name"""
+        name = name.lower()
+        self.instances.pop(name, None)
+        if isinstance(provider, (str, type)):
+            self.providers[name] = provider
+        else:
+            self.providers[name] = type(provider)
+            self.instances[name] = provider
+
+    def names(self) -> str:
+        """The registered provider names, for validation messages"""
+        return ", ".join(self.providers)
+
+    def check(self, name: str) -> str:
+        """Normalize a provider name, rejecting names nothing is registered under"""
+        name = name.lower()
+        if name not in self.providers:
+            raise ValueError(f"Unknown {self.kind} provider: {name} (registered: {self.names()})")
+        return name
+
+    def get(self, name: str) -> Any:
+        """Get the shared provider instance, building it on first use"""
+        name = self.check(name)
+
+        if name not in self.instances:
+            provider = self.providers[name]
+            if isinstance(provider, str):
+                provider = self.providers[name] = import_provider(provider)
+            self.instances[name] = self.build(name, provider)
+        return self.instances[name]
+
+    async def startup(self):
+        """Build every registered provider up front and run its async start hook if it has one"""
+        for name in self.providers:
+            provider = self.get(name)
+            if hasattr(provider, "start"):
+                await provider.start()
+        logging.info(f"✅ {self.kind} providers ready: {', '.join(self.instances)}")
+
+    async def shutdown(self):
+        """Release provider-owned resources (pools, sessions) via their aclose hook"""
+        for name, provider in self.instances.items():
+            if hasattr(provider, "aclose"):
+                try:
+                    await provider.aclose()
+                except Exception as e:
+                    logging.error(f"Failed to close {self.kind} provider '{name}': {str(e)}")
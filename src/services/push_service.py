@@ -6,6 +6,8 @@ from datetime import datetime
 import uuid
 from typing import Dict, Any, Optional
 from src.utils.libs.logging import logging
+from src.core.config import settings
+from .provider_registry import ProviderRegistry
 
 
 class BasePushProvider(ABC):
@@ -123,14 +125,12 @@ class PushNotificationServiceFactory:
     """Factory class to get the appropriate push notification provider"""
     
     _providers = {
-        "firebase": FirebasePushProvider
+        "firebase": FirebasePushProvider,
+        **settings.push_providers
     }
+    registry = ProviderRegistry("push notification", _providers)
     
     @classmethod
     def get_provider(cls, provider_type: str = "firebase") -> BasePushProvider:
-        """Get push notification provider instance based on type"""
-        provider_type = provider_type.lower()
-        if provider_type not in cls._providers:
-            raise ValueError(f"Unknown push notification provider: {provider_type}")
-        
-        return cls._providers[provider_type]()
+        """Get the long-lived push notification provider instance based on type"""
+        return cls.registry.get(provider_type)
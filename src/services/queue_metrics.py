@@ -0,0 +1,39 @@
+"""
+Queue Metrics - Prometheus metrics for the RabbitMQ consumer path
+
+Registered on the default prometheus_client registry, so they are served from the same /metrics
+endpoint the HTTP Instrumentator exposes.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+MESSAGES_CONSUMED = Counter(
+    "notification_queue_messages_consumed_total",
+    "Deliveries taken off a queue",
+    ["queue", "type"]
+)
+MESSAGE_OUTCOMES = Counter(
+    "notification_queue_messages_total",
+    "Deliveries by outcome: acked, retried or dead_lettered (rejected)",
+    ["queue", "type", "outcome"]
+)
+HANDLER_DURATION = Histogram(
+    "notification_queue_handler_duration_seconds",
+    "Time a handler (or the batch a message joined) took to process a delivery",
+    ["queue", "type"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+MESSAGES_IN_FLIGHT = Gauge(
+    "notification_queue_messages_in_flight",
+    "Deliveries currently being processed",
+    ["queue"]
+)
+QUEUE_DEPTH = Gauge(
+    "notification_queue_depth",
+    "Ready messages in a queue, polled with a passive declare",
+    ["queue"]
+)
+QUEUE_CONSUMERS = Gauge(
+    "notification_queue_consumers",
+    "Consumers attached to a queue, polled with a passive declare",
+    ["queue"]
+)
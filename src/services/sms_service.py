@@ -3,50 +3,88 @@ SMS Service - Core implementation for different SMS providers
 """
 from abc import ABC, abstractmethod
 from datetime import datetime
-import uuid, asyncio, httpx, aiosmtplib
+import uuid, asyncio, httpx
 from src.utils.libs.logging import logging
 from src.core.config import (settings)
+from src.utils.libs.http_pool import HTTPClientPool
+from .bulk_sender import BulkSender
+from .token_cache import TokenCache
+from .provider_registry import ProviderRegistry
 import urllib.parse
 from typing import Any
 
-async def send_sms(url, payload, headers, method:str = "POST"):
-    async with httpx.AsyncClient(timeout=30) as client:
-        logging.info(f"payload : {payload}")
-        logging.info(f"headers : {headers}")
-        logging.info(f"url : {url}")
-        logging.info(f"method : {method}")
-        resp = await client.request(method, url, json=payload, headers=headers)
-        resp.raise_for_status()
-        print(resp.text)
-        if resp.text == "3: Queued for later delivery":
-            return resp.text 
+# Keep-alive connection pools, one client per provider; opened/closed in main.lifespan
+sms_http_pool = HTTPClientPool(
+    max_connections=settings.sms_http_max_connections,
+    max_keepalive_connections=settings.sms_http_max_keepalive_connections,
+    keepalive_expiry=settings.sms_http_keepalive_expiry,
+    timeout=settings.sms_http_timeout,
+    http2_providers=settings.sms_http2_providers
+)
 
-        if resp.json().get("status") is False:
-            if resp.json().get("message") == "Request failed: No Opt-in":
-                return resp.json().get("message")
+async def send_sms(url, payload, headers, method:str = "POST", client: httpx.AsyncClient = None):
+    client = client or sms_http_pool.client("default")
+    logging.info(f"payload : {payload}")
+    logging.info(f"headers : {headers}")
+    logging.info(f"url : {url}")
+    logging.info(f"method : {method}")
+    resp = await client.request(method, url, json=payload, headers=headers)
+    resp.raise_for_status()
+    print(resp.text)
+    if resp.text == "3: Queued for later delivery":
+        return resp.text 
 
-            raise Exception(resp.json().get("message"))
-        
-        return resp.json()
+    if resp.json().get("status") is False:
+        if resp.json().get("message") == "Request failed: No Opt-in":
+            return resp.json().get("message")
+
+        raise Exception(resp.json().get("message"))
+    
+    return resp.json()
 
 class BaseSMSProvider(ABC):
     """Abstract base class for SMS providers"""
+
+    provider_key: str = None
+    pool_name: str = None  # sms_http_pool client name, set by the factory; defaults to provider_key
+
+    def __init__(self, client: httpx.AsyncClient = None):
+        self._client = client
+        # Shared by every bulk on this provider so they split the gateway's concurrency and rate budget
+        self.bulk_sender = BulkSender(
+            concurrency=settings.sms_bulk_concurrency.get(self.provider_key, settings.sms_bulk_default_concurrency),
+            rate=settings.sms_bulk_rate.get(self.provider_key, 0)
+        )
     
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The injected client, else the pool's current one
+
+        Looked up on every use: providers live in the registry beyond a lifespan, and the pool
+        replaces its clients after sms_http_pool.aclose().
+        """
+        return self._client or sms_http_pool.client(self.pool_name or self.provider_key or "default")
+
     @abstractmethod
     async def send(self, phone_number: str, message: str, type: str = "FLASH", payload: Any = None) -> dict:
         """Send SMS to a single recipient"""
         pass
     
-    @abstractmethod
     async def send_bulk(self, phone_numbers: list, message: str, type: str = "FLASH", payload: Any = None) -> list:
         """Send SMS to multiple recipients"""
-        pass
+        return await self.bulk_sender.run(
+            phone_numbers,
+            lambda phone_number: self.send(phone_number, message, type, payload)
+        )
 
 
 class ExternalSMSProvider(BaseSMSProvider):
     """External SMS Provider Implementation"""
     
-    def __init__(self):
+    provider_key = "external"
+
+    def __init__(self, client: httpx.AsyncClient = None):
+        super().__init__(client)
         self.provider_name = "EXTERNAL"
     
     async def send(self, phone_number: str, message: str, type: str = "FLASH", _payload: Any = {}) -> dict:
@@ -70,7 +108,7 @@ class ExternalSMSProvider(BaseSMSProvider):
                 "msgtype": type,
                 "LinkID": datetime.utcnow().isoformat()
             }
-            resp = await send_sms(url, payload, headers)
+            resp = await send_sms(url, payload, headers, client=self.client)
             return {
                 "response": resp['message'] if resp['message'] else resp,
                 "phone_number": phone_number,
@@ -88,23 +126,18 @@ class ExternalSMSProvider(BaseSMSProvider):
                 "provider": self.provider_name,
                 "timestamp": datetime.utcnow().isoformat()
             }
-    
-    async def send_bulk(self, phone_numbers: list, message: str, type: str = "FLASH", payload: Any = {}) -> list:
-        """Send bulk SMS via local provider"""
-        results = []
-        for phone_number in phone_numbers:
-            result = await self.send(phone_number, message, type, payload)
-            results.append(result)
-        return results
 
 
 class LocalSMSProvider(BaseSMSProvider):
     """Local SMS Provider Implementation"""
     
-    def __init__(self):
+    provider_key = "smpp"
+
+    def __init__(self, client: httpx.AsyncClient = None):
+        super().__init__(client)
         self.provider_name = "SMPP"
     
-    async def send(self, phone_number: str, message: str, type: str = "FLASH") -> dict:
+    async def send(self, phone_number: str, message: str, type: str = "FLASH", payload: Any = None) -> dict:
         """Send SMS via local provider"""
         try:
             message_id = str(uuid.uuid4())
@@ -114,7 +147,7 @@ class LocalSMSProvider(BaseSMSProvider):
                     "Content-Type": "application/json",
                     "Accept": "application/json"
             }
-            resp = await send_sms(url, {}, headers, "GET")
+            resp = await send_sms(url, {}, headers, "GET", client=self.client)
             return {
                 "response": resp,
                 "phone_number": phone_number,
@@ -132,23 +165,35 @@ class LocalSMSProvider(BaseSMSProvider):
                 "provider": self.provider_name,
                 "timestamp": datetime.utcnow().isoformat()
             }
-    
-    async def send_bulk(self, phone_numbers: list, message: str, type: str = "FLASH") -> list:
-        """Send bulk SMS via local provider"""
-        results = []
-        for phone_number in phone_numbers:
-            result = await self.send(phone_number, message, type)
-            results.append(result)
-        return results
 
 
 class PSISMSProvider(BaseSMSProvider):
     """PSI SMS Provider Implementation"""
     
-    def __init__(self):
+    provider_key = "pisi"
+
+    def __init__(self, client: httpx.AsyncClient = None):
+        super().__init__(client)
         self.provider_name = "PISI"
+        self.token_cache = TokenCache(
+            self.create_token,
+            ttl=settings.pisi_token_ttl,
+            refresh_margin=settings.pisi_token_refresh_margin
+        )
+
+    async def create_token(self, vaspid: str):
+        """Create a PISI authorization token, returning (token, expires_in)"""
+        headers = {
+                "Content-Type": "application/json",
+                "Accept": "application/json"
+        }
+        resp = await send_sms( f"{settings.pisi_url}authentication/create", { "vaspid": vaspid }, headers, client=self.client )
+        if resp['success'] is False:
+            raise Exception("token not generated successfully")
+
+        return resp['pisi-authorization-token'], resp.get('expires_in')
     
-    async def send(self, phone_number: str, message: str, type: str = "FLASH") -> dict:
+    async def send(self, phone_number: str, message: str, type: str = "FLASH", payload: Any = None) -> dict:
         """Send SMS via PSI provider"""
         try:
             message_id = str(uuid.uuid4())
@@ -158,19 +203,21 @@ class PSISMSProvider(BaseSMSProvider):
                     "Content-Type": "application/json",
                     "Accept": "application/json"
             }
-            payload = { "vaspid": "3" }
-            resp = await send_sms( f"{settings.pisi_url}authentication/create", payload, headers )
-            if resp['success'] is False:
-                raise Exception("token not generated successfully")
+            token = await self.token_cache.get(settings.pisi_vaspid)
             
             payload = {
                 "MSISDN": f"{phone_number}",
                 "ServiceID": "1409",
                 "Text": message,
-                "TokenID": resp['pisi-authorization-token'],
+                "TokenID": token,
                 "TransactionID": datetime.utcnow().isoformat()
             }
-            resp = await send_sms( f"{settings.pisi_url.replace('net', 'com')}../api/SendSMS", payload, headers )
+            try:
+                resp = await send_sms( f"{settings.pisi_url.replace('net', 'com')}../api/SendSMS", payload, headers, client=self.client )
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code in (401, 403):
+                    self.token_cache.invalidate(settings.pisi_vaspid)
+                raise
             logging.info(f"Sending SMS via PSI provider response {resp}")
             return {
                 "phone_number": "phone_number",
@@ -188,23 +235,18 @@ class PSISMSProvider(BaseSMSProvider):
                 "provider": self.provider_name,
                 "timestamp": datetime.utcnow().isoformat()
             }
-    
-    async def send_bulk(self, phone_numbers: list, message: str, type: str = "FLASH") -> list:
-        """Send bulk SMS via PSI provider"""
-        results = []
-        for phone_number in phone_numbers:
-            result = await self.send(phone_number, message, type)
-            results.append(result)
-        return results
 
 
 class CORPORATESMSProvider(BaseSMSProvider):
     """Cooperate SMS Provider Implementation (e.g., Twilio, AWS SNS)"""
     
-    def __init__(self):
+    provider_key = "coroperate"
+
+    def __init__(self, client: httpx.AsyncClient = None):
+        super().__init__(client)
         self.provider_name = "CORPORATE"
     
-    async def send(self, phone_number: str, message: str, type: str = "FLASH") -> dict:
+    async def send(self, phone_number: str, message: str, type: str = "FLASH", payload: Any = None) -> dict:
         """Send SMS via third-party provider"""
         try:
             message_id = str(uuid.uuid4())
@@ -216,7 +258,7 @@ class CORPORATESMSProvider(BaseSMSProvider):
                     "Content-Type": "application/json",
                     "Accept": "application/json"
             }
-            resp = await send_sms(url, {}, headers, "GET")
+            resp = await send_sms(url, {}, headers, "GET", client=self.client)
             
             return {
                 "phone_number": phone_number,
@@ -234,14 +276,13 @@ class CORPORATESMSProvider(BaseSMSProvider):
                 "provider": self.provider_name,
                 "timestamp": datetime.utcnow().isoformat()
             }
-    
-    async def send_bulk(self, phone_numbers: list, message: str, type: str = "FLASH") -> list:
-        """Send bulk SMS via third-party provider"""
-        results = []
-        for phone_number in phone_numbers:
-            result = await self.send(phone_number, message, type)
-            results.append(result)
-        return results
+
+
+def _build_provider(name: str, provider_class: type) -> BaseSMSProvider:
+    """Build a provider that sends through the pooled client named after it"""
+    provider = provider_class()
+    provider.pool_name = name
+    return provider
 
 
 class SMSServiceFactory:
@@ -251,14 +292,12 @@ class SMSServiceFactory:
         "smpp": LocalSMSProvider,
         "pisi": PSISMSProvider,
         "coroperate": CORPORATESMSProvider,
-        "external": ExternalSMSProvider
+        "external": ExternalSMSProvider,
+        **settings.sms_providers
     }
+    registry = ProviderRegistry("SMS", _providers, build=_build_provider)
     
     @classmethod
     def get_provider(cls, provider_type: str) -> BaseSMSProvider:
-        """Get SMS provider instance based on type"""
-        provider_type = provider_type.lower()
-        if provider_type not in cls._providers:
-            raise ValueError(f"Unknown SMS provider: {provider_type}")
-        
-        return cls._providers[provider_type]()
+        """Get the long-lived SMS provider instance based on type"""
+        return cls.registry.get(provider_type)
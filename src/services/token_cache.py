@@ -0,0 +1,56 @@
+"""
+Token Cache - reuses provider auth tokens until near expiry
+"""
+import asyncio, time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from src.utils.libs.logging import logging
+
+
+class TokenCache:
+    """Per-key auth token cache with proactive background refresh and single-flight fetches"""
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Tuple[str, Optional[float]]]], ttl: float = 3000, refresh_margin: float = 300):
+        self.fetch = fetch  # returns (token, expires_in seconds or None to use ttl)
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.tokens: Dict[str, Tuple[str, float]] = {}  # {key: (token, expires_at)}
+        self.refreshing: Dict[str, asyncio.Task] = {}
+
+    async def get(self, key: str) -> str:
+        """Return a valid token, fetching it only when none is cached or it has expired"""
+        now = time.monotonic()
+        cached = self.tokens.get(key)
+        if cached and now < cached[1]:
+            if now >= cached[1] - self.refresh_margin:
+                self._refresh(key)
+            return cached[0]
+
+        # shield so one cancelled caller doesn't cancel the fetch everyone else is waiting on
+        return await asyncio.shield(self._refresh(key))
+
+    def invalidate(self, key: str = None):
+        """Drop a cached token (or all of them) so the next get() fetches a fresh one"""
+        if key is None:
+            self.tokens.clear()
+        else:
+            self.tokens.pop(key, None)
+
+    def _refresh(self, key: str) -> asyncio.Task:
+        """Start a fetch for key unless one is already in flight"""
+        task = self.refreshing.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key), name=f"token-refresh-{key}")
+            task.add_done_callback(lambda t: self._on_refreshed(key, t))
+            self.refreshing[key] = task
+        return task
+
+    async def _fetch(self, key: str) -> str:
+        token, expires_in = await self.fetch(key)
+        self.tokens[key] = (token, time.monotonic() + (expires_in or self.ttl))
+        return token
+
+    def _on_refreshed(self, key: str, task: asyncio.Task):
+        if self.refreshing.get(key) is task:
+            del self.refreshing[key]
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Token refresh for '{key}' failed: {task.exception()}")
@@ -5,4 +5,7 @@ from .errors import *
 from .exception_handler import *
 from .rate_limiting import *
 from .helper import *
-from .log_generator import *
\ No newline at end of file
+from .log_generator import *
+from .cache import *
+from .recipient_stream import *
+from .recipients import *
@@ -1,4 +1,14 @@
+from typing import Any
 from fastapi.responses import JSONResponse
+from ..libs import serializer
+
+
+class SerializedJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fastest installed JSON backend (see libs.serializer)"""
+
+    def render(self, content: Any) -> bytes:
+        return serializer.dumps(content)
+
 
 def build_success_response(message: str, status: int = 200, data = None):
     resp = {
@@ -7,7 +17,7 @@ def build_success_response(message: str, status: int = 200, data = None):
     }
     if data is not None:
         resp['data'] = data
-    return JSONResponse(
+    return SerializedJSONResponse(
         status_code=status,
         content=resp
     )
@@ -20,7 +30,7 @@ def build_error_response(message: str, status: int = 400, data: dict = None):
     }
     if data is not None:
         resp['data'] = data
-    return JSONResponse(
+    return SerializedJSONResponse(
         status_code=status,
         content=resp
     )
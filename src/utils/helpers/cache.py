@@ -0,0 +1,39 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """In-memory LRU cache whose entries also expire `ttl` seconds after they were stored"""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # {key: (value, expires_at)}
+
+    def get(self, key: Hashable, default: Any = None) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        if time.monotonic() >= entry[1]:
+            del self.entries[key]
+            return default
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        self.entries[key] = (value, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable = None) -> int:
+        """Drop one entry, or everything when no key is given; returns how many were removed"""
+        if key is None:
+            count = len(self.entries)
+            self.entries.clear()
+            return count
+        return 1 if self.entries.pop(key, None) is not None else 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,145 @@
+import csv, re
+from typing import AsyncIterator, Callable, List, Optional, Sequence
+from pydantic.networks import validate_email
+from src.utils.libs import serializer
+from src.utils.helpers.errors import BadRequestError
+
+PHONE_PATTERN = re.compile(r"^\+?\d{7,15}$")
+LINE_BREAK = re.compile(rb"\r\n|\r|\n")
+UPLOAD_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+    "application/csv": "csv",
+}
+
+
+def upload_format(content_type: Optional[str]) -> str:
+    """ndjson or csv, from a request's Content-Type"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type not in UPLOAD_FORMATS:
+        raise BadRequestError(
+            message="Unsupported upload format",
+            verboseMessage=f"Content-Type must be one of {', '.join(UPLOAD_FORMATS)}, got {media_type or 'none'}"
+        )
+    return UPLOAD_FORMATS[media_type]
+
+
+def validate_phone_number(value: str) -> str:
+    phone_number = re.sub(r"[\s\-()]", "", value)
+    if not PHONE_PATTERN.match(phone_number):
+        raise ValueError("not a phone number")
+    return phone_number
+
+
+def validate_email_address(value: str) -> str:
+    return validate_email(value)[1]
+
+
+class RecipientStream:
+    """Parse an uploaded NDJSON or CSV recipient list as it arrives, in chunks of valid recipients
+
+    NDJSON lines are a recipient string or an object holding one of `columns`; CSV rows take the
+    `columns` column when the first row is a header, else the first column. Invalid rows are
+    counted (with the first `max_errors` kept for the response) and skipped, so one bad address
+    does not reject a whole upload. Lines may end in LF, CRLF or CR; a line longer than
+    `max_line_bytes` rejects the upload, so at most one line is ever buffered.
+    """
+
+    def __init__(self, body: AsyncIterator[bytes], fmt: str, validate: Callable[[str], str],
+                 columns: Sequence[str], chunk_size: int, max_recipients: int, max_errors: int = 20,
+                 max_line_bytes: int = 4096):
+        self.body = body
+        self.fmt = fmt
+        self.validate = validate
+        self.columns = [column.lower() for column in columns]
+        self.chunk_size = chunk_size
+        self.max_recipients = max_recipients
+        self.max_errors = max_errors
+        self.max_line_bytes = max_line_bytes
+        self.accepted = 0
+        self.invalid = 0
+        self.errors: List[dict] = []
+        self.line_number = 0
+        self.csv_column: Optional[int] = None
+
+    def too_long(self, line_number: int):
+        raise BadRequestError(
+            message="Upload line too long",
+            verboseMessage=f"Line {line_number} exceeds {self.max_line_bytes} bytes"
+        )
+
+    def reject(self, value, error: str):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": self.line_number, "value": str(value)[:200], "error": error})
+
+    def value_of(self, line: str) -> Optional[str]:
+        """The raw recipient on a line, or None for a (CSV) header row"""
+        if self.fmt == "ndjson":
+            item = serializer.loads(line)
+            if isinstance(item, dict):
+                item = next((item[key] for key in item if key.lower() in self.columns), None)
+            if not isinstance(item, str):
+                raise ValueError(f"expected a string or an object with one of {', '.join(self.columns)}")
+            return item
+
+        row = next(csv.reader([line]))
+        if self.csv_column is None:
+            header = [cell.strip().lower() for cell in row]
+            self.csv_column = next((header.index(column) for column in self.columns if column in header), 0)
+            if self.line_number == 1 and any(column in header for column in self.columns):
+                return None
+        if self.csv_column >= len(row):
+            raise ValueError("missing recipient column")
+        return row[self.csv_column]
+
+    def parse(self, raw: bytes, chunk: List[str]):
+        self.line_number += 1
+        try:
+            line = raw.decode("utf-8-sig" if self.line_number == 1 else "utf-8").strip()
+        except UnicodeDecodeError:
+            return self.reject(raw[:200], "not UTF-8")
+        if not line:
+            return
+        try:
+            value = self.value_of(line)
+            if value is None:
+                return
+            chunk.append(self.validate(value.strip()))
+        except ValueError as e:
+            return self.reject(line, str(e).splitlines()[0] if str(e) else "invalid")
+        self.accepted += 1
+        if self.accepted > self.max_recipients:
+            raise BadRequestError(
+                message="Too many recipients",
+                verboseMessage=f"Uploads are limited to {self.max_recipients} recipients"
+            )
+
+    async def __aiter__(self):
+        buffer, chunk, after_cr = bytearray(), [], False
+        async for data in self.body:
+            if not data:
+                continue
+            # A CRLF split across two reads: the CR already ended the line
+            if after_cr and data.startswith(b"\n"):
+                data = data[1:]
+            buffer += data
+            after_cr = buffer.endswith(b"\r")
+            *lines, tail = LINE_BREAK.split(buffer)
+            if len(tail) > self.max_line_bytes:
+                self.too_long(self.line_number + len(lines) + 1)
+            for raw in lines:
+                # A whole over-long line can arrive within a single read
+                if len(raw) > self.max_line_bytes:
+                    self.too_long(self.line_number + 1)
+                self.parse(bytes(raw), chunk)
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            buffer = bytearray(tail)
+        if buffer.strip():
+            self.parse(bytes(buffer), chunk)
+        if chunk:
+            yield chunk
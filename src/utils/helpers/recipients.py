@@ -0,0 +1,82 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+PHONE_PUNCTUATION = str.maketrans("", "", " -().\t")
+
+
+def normalize_phone_number(phone_number: str, country_code: str, national_digits: int = 10) -> str:
+    """E.164 form of a phone number: +234…, 00234…, 234… and 0… all become +234…
+
+    Numbers that are not digits after removing punctuation are returned stripped but otherwise
+    unchanged, so they still compare equal only to themselves.
+    """
+    number = str(phone_number).strip().translate(PHONE_PUNCTUATION)
+    international = number.startswith("+")
+    digits = number[1:] if international else number
+    if not digits.isdigit():
+        return number
+
+    if not international:
+        if digits.startswith("00"):
+            digits = digits[2:]
+        elif digits.startswith("0"):
+            digits = country_code + digits[1:]
+        elif not (digits.startswith(country_code) and len(digits) > national_digits):
+            digits = country_code + digits
+    # +234 (0) 803… keeps the trunk 0 in the international form
+    if digits.startswith(country_code + "0"):
+        digits = country_code + digits[len(country_code) + 1:]
+    return "+" + digits
+
+
+def normalize_email(email: str) -> str:
+    """An email address with its domain case-folded; the local part is case-sensitive and kept"""
+    local, at, domain = str(email).strip().rpartition("@")
+    return f"{local}@{domain.casefold()}" if at else domain
+
+
+def dedupe_recipients(recipients: Iterable[str], key: Callable[[str], str]) -> Tuple[List[str], List[int]]:
+    """
+    Drop recipients whose normalized key was already seen
+
+    Returns:
+        The unique recipients in first-seen order (as given, not normalized), and for every input
+        recipient the index of its unique entry
+    """
+    seen: Dict[str, int] = {}
+    unique: List[str] = []
+    index_of: List[int] = []
+    for recipient in recipients:
+        index = seen.setdefault(key(recipient), len(unique))
+        if index == len(unique):
+            unique.append(recipient)
+        index_of.append(index)
+    return unique, index_of
+
+
+def drop_duplicates(recipients: Iterable[str], key: Callable[[str], str], seen: Optional[Set[str]] = None) -> List[str]:
+    """The recipients whose normalized key is not in `seen` yet, first occurrence only, as given
+
+    The keys are added to `seen`, so passing the same set to every call dedupes a list that
+    arrives in chunks (a streamed upload) across all of them.
+    """
+    seen = set() if seen is None else seen
+    unique = []
+    for recipient in recipients:
+        recipient_key = key(recipient)
+        if recipient_key not in seen:
+            seen.add(recipient_key)
+            unique.append(recipient)
+    return unique
+
+
+def expand_results(results: List[Dict[str, Any]], index_of: List[int]) -> List[Dict[str, Any]]:
+    """Per-recipient results of a deduplicated send, back in the order of the original recipients
+
+    A duplicate gets the result of the recipient it duplicated, flagged with "duplicate": True, so
+    callers that align results with their recipient list (job ledger, queue retries) keep working.
+    """
+    expanded, seen = [], set()
+    for index in index_of:
+        expanded.append(results[index] if index not in seen else {**results[index], "duplicate": True})
+        seen.add(index)
+    return expanded
@@ -1,6 +1,9 @@
 from .middeware import *
 from .logging import logger, log_handler
 from .mailing import EmailLib
+from .http_pool import HTTPClientPool
+from .smtp_pool import SMTPConnectionPool
+from . import serializer
 from .security import *
 from .keycloak import (KeycloakClient, KeycloakMiddleware, auth_required)
 from .sentry import *
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+HTTP Client Pool - long-lived, keep-alive httpx clients shared per provider
+"""
+import httpx
+from typing import Dict, Iterable
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport to count the requests sent through it and those awaiting a response"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+        self.requests = 0
+        self.in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class HTTPClientPool:
+    """Registry of pooled httpx.AsyncClient instances, one per provider name"""
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, timeout: float = 30.0, http2_providers: Iterable[str] = ()):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.http2_providers = {name.lower() for name in http2_providers}
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.transports: Dict[str, CountingTransport] = {}
+
+    def _build_client(self, name: str) -> httpx.AsyncClient:
+        transport = CountingTransport(
+            httpx.AsyncHTTPTransport(limits=self.limits, http2=name in self.http2_providers)
+        )
+        self.transports[name] = transport
+        return httpx.AsyncClient(timeout=self.timeout, transport=transport)
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        """Get (or lazily create) the pooled client for a provider"""
+        name = name.lower()
+        client = self.clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build_client(name)
+            self.clients[name] = client
+        return client
+
+    async def start(self, names: Iterable[str]):
+        """Create the clients up front so the first message doesn't pay for it"""
+        for name in names:
+            self.client(name)
+
+    async def aclose(self):
+        """Close every pooled client and drop its keep-alive connections"""
+        for client in self.clients.values():
+            if not client.is_closed:
+                await client.aclose()
+        self.clients.clear()
+        self.transports.clear()
+
+    def stats(self) -> dict:
+        """Request counts per provider, shaped like the other health checks"""
+        details = {}
+        for name, client in self.clients.items():
+            transport = self.transports[name]
+            details[name] = {
+                "http2": name in self.http2_providers,
+                "closed": client.is_closed,
+                "requests": transport.requests,
+                "in_flight": transport.in_flight,
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections
+            }
+
+        return {
+            "status": "healthy" if all(not c.is_closed for c in self.clients.values()) else "unhealthy",
+            "details": details
+        }
@@ -1,27 +1,104 @@
+import asyncio, os, re, time
 from email.message import EmailMessage
 from http.client import HTTPException
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List
 from aiosmtplib import send
-from src.core.config import settings, os
+
+
+class CompiledTemplate:
+    """A template pre-split around its {{placeholders}} so rendering is a single join"""
+
+    PLACEHOLDER = re.compile(r"({{\s*\w+\s*}})")
+
+    def __init__(self, source: str, mtime: float):
+        self.source = source
+        self.mtime = mtime
+        self.checked_at = time.monotonic()
+        # even indexes are literal text, odd indexes are (placeholder text, field name)
+        self.segments = [
+            (part, part.strip("{} \t")) if index % 2 else part
+            for index, part in enumerate(self.PLACEHOLDER.split(source))
+        ]
+
+    def render(self, **context) -> str:
+        """Substitute known fields; unknown placeholders are left as-is"""
+        return "".join(
+            context.get(segment[1], segment[0]) if index % 2 else segment
+            for index, segment in enumerate(self.segments)
+        )
+
+
+class TemplateRegistry:
+    """Caches compiled templates, re-reading a file only when its mtime changes"""
+
+    def __init__(self, root: str = "templates", check_interval: float = None):
+        self.root = root
+        self._check_interval = check_interval  # seconds between mtime checks per template
+        self.templates: Dict[str, CompiledTemplate] = {}
+
+    @property
+    def check_interval(self) -> float:
+        """The interval given, else TEMPLATE_CHECK_INTERVAL"""
+        if self._check_interval is None:
+            from src.core.config import settings  # not at import time: src.core.config imports src.utils.libs
+            self._check_interval = settings.template_check_interval
+        return self._check_interval
+
+    @staticmethod
+    def _read(file_path: str):
+        with open(file_path, 'r') as file:
+            return file.read(), os.path.getmtime(file_path)
+
+    async def get(self, folder: str, name: str) -> CompiledTemplate:
+        file_path = os.path.join(f"{self.root}/{folder}", f"{name}.html")
+        template = self.templates.get(file_path)
+        if template is not None:
+            if time.monotonic() - template.checked_at < self.check_interval:
+                return template
+            # file I/O stays off the event loop
+            mtime = await asyncio.to_thread(os.path.getmtime, file_path)
+            if mtime == template.mtime:
+                template.checked_at = time.monotonic()
+                return template
+
+        source, mtime = await asyncio.to_thread(self._read, file_path)
+        template = self.templates[file_path] = CompiledTemplate(source, mtime)
+        return template
+
+    def invalidate(self, folder: str = None, name: str = None):
+        """Drop one cached template, or all of them when no name is given"""
+        if name is None:
+            self.templates.clear()
+        else:
+            self.templates.pop(os.path.join(f"{self.root}/{folder or ''}", f"{name}.html"), None)
+
+
+template_registry = TemplateRegistry()
+
 
 class EmailLib():
 
     async def get_template(folder: str, name: str):
         try:
-            file_path = os.path.join(f"templates/{folder}", f"{name}.html")
-            with open(file_path, 'r') as file:
-                html_content = file.read()
-                return html_content
+            template = await template_registry.get(folder, name)
+            return template.source
+        except Exception as e:
+            raise Exception(str(e))
+
+    async def render_template(folder: str, name: str, **context) -> str:
+        try:
+            template = await template_registry.get(folder, name)
+            return template.render(**context)
         except Exception as e:
             raise Exception(str(e))
 
 
     async def send_email(subject, recipient_email: str, body: str, use_template: bool = False):
+        from src.core.config import settings  # not at import time: src.core.config imports src.utils.libs
         try :
             # if use_template :
-            html_content = await EmailLib.get_template('', 'index')
-            html_body = html_content.replace('{{body}}', body)
+            html_body = await EmailLib.render_template('', 'index', body=body)
             message = EmailMessage()
             message["From"] = f"{settings.mail_from_name} <{settings.mail_sender}>"
             message["Reply-To"] = settings.mail_sender
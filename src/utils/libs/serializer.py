@@ -0,0 +1,68 @@
+"""
+Serializer - JSON encode/decode for queue bodies and API responses
+
+Uses orjson, else msgspec, when installed and falls back to the stdlib json module, so every
+backend produces the same compact UTF-8 JSON bytes.
+"""
+import json
+from enum import Enum
+from typing import Any
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional speedup
+    msgspec = None
+
+def _default(obj: Any) -> Any:
+    """Encode the non-JSON types our payloads carry"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(data: Any) -> Any:
+        return orjson.loads(data)
+
+elif msgspec is not None:
+    BACKEND = "msgspec"
+    _encoder = msgspec.json.Encoder(enc_hook=_default)
+    _decoder = msgspec.json.Decoder()
+
+    def dumps(obj: Any) -> bytes:
+        return _encoder.encode(obj)
+
+    def loads(data: Any) -> Any:
+        return _decoder.decode(data)
+
+else:
+    BACKEND = "json"
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def loads(data: Any) -> Any:
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data).decode()
+        return json.loads(data)
+
+
+# What loads() raises on malformed or mistyped input, whichever backend is active
+DECODE_ERRORS = (ValueError,) if msgspec is None else (ValueError, msgspec.DecodeError)
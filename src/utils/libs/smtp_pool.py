@@ -0,0 +1,158 @@
+"""
+SMTP Connection Pool - reusable, authenticated aiosmtplib sessions
+"""
+import asyncio, time
+from collections import deque
+from email.message import EmailMessage
+from typing import Awaitable, Callable, Deque, Optional, Sequence
+from aiosmtplib import (
+    SMTP, SMTPConnectError, SMTPException, SMTPRecipientsRefused,
+    SMTPResponseException, SMTPServerDisconnected, SMTPTimeoutError
+)
+from .logging import logging
+
+
+class PooledSMTPConnection:
+    """An open SMTP session plus the bookkeeping the pool needs to recycle it"""
+
+    def __init__(self, smtp: SMTP):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Keeps up to `size` connected + EHLO'd + STARTTLS'd + AUTH'd sessions for reuse across messages"""
+
+    def __init__(self, hostname: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 start_tls: Optional[bool] = None, use_tls: bool = False, validate_certs: bool = True,
+                 timeout: float = 30, size: int = 10, max_messages: int = 100, health_check_interval: float = 30,
+                 retries: int = 1):
+        self.connect_kwargs = {
+            "hostname": hostname,
+            "port": port,
+            "username": username or None,
+            "password": password or None,
+            "start_tls": start_tls,
+            "use_tls": use_tls,
+            "validate_certs": validate_certs,
+            "timeout": timeout,
+        }
+        self.size = size
+        self.max_messages = max_messages  # recycle a session after this many messages
+        self.health_check_interval = health_check_interval  # NOOP sessions idle for longer than this
+        self.retries = retries  # reconnect-and-resend attempts on transient (4xx/421/disconnect) failures
+        self.semaphore = asyncio.Semaphore(size)
+        self.idle: Deque[PooledSMTPConnection] = deque()
+        self.created = 0
+        self.recycled = 0
+        self.discarded = 0
+
+    async def _connect(self) -> PooledSMTPConnection:
+        smtp = SMTP(**self.connect_kwargs)
+        await smtp.connect()
+        self.created += 1
+        return PooledSMTPConnection(smtp)
+
+    async def _checkout(self) -> PooledSMTPConnection:
+        """Take a healthy idle session (most recently used first) or open a new one"""
+        while self.idle:
+            conn = self.idle.pop()
+            if not conn.smtp.is_connected:
+                self.discarded += 1
+                continue
+            if time.monotonic() - conn.last_used > self.health_check_interval:
+                try:
+                    await conn.smtp.noop()
+                except SMTPException:
+                    await self._discard(conn)
+                    continue
+            return conn
+        return await self._connect()
+
+    async def _checkin(self, conn: PooledSMTPConnection):
+        if conn.messages_sent >= self.max_messages:
+            self.recycled += 1
+            await self._quit(conn)
+            return
+        conn.last_used = time.monotonic()
+        self.idle.append(conn)
+
+    async def _discard(self, conn: Optional[PooledSMTPConnection]):
+        if conn is None:
+            return
+        self.discarded += 1
+        await self._quit(conn)
+
+    @staticmethod
+    async def _quit(conn: PooledSMTPConnection):
+        try:
+            if conn.smtp.is_connected:
+                await conn.smtp.quit()
+        except SMTPException:
+            conn.smtp.close()
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """Failures worth retrying on a fresh session: dropped connections, timeouts and 4xx replies (incl. 421)"""
+        if isinstance(error, (SMTPServerDisconnected, SMTPConnectError, SMTPTimeoutError)):
+            return True
+        if isinstance(error, SMTPResponseException):
+            return 400 <= error.code < 500
+        if isinstance(error, SMTPRecipientsRefused):
+            return all(400 <= refused.code < 500 for refused in error.recipients)
+        return False
+
+    async def _run(self, operation: Callable[[SMTP], Awaitable]):
+        for attempt in range(self.retries + 1):
+            async with self.semaphore:
+                conn = None
+                try:
+                    conn = await self._checkout()
+                    result = await operation(conn.smtp)
+                except SMTPException as e:
+                    if self._is_transient(e):
+                        await self._discard(conn)
+                        if attempt < self.retries:
+                            logging.warning(f"SMTP transient failure, reconnecting: {str(e)}")
+                            continue
+                        raise
+
+                    # Permanent rejection of this message; the session itself is still usable
+                    if conn is not None:
+                        try:
+                            await conn.smtp.rset()
+                            await self._checkin(conn)
+                        except SMTPException:
+                            await self._discard(conn)
+                    raise
+                except BaseException:
+                    await self._discard(conn)
+                    raise
+
+                conn.messages_sent += 1
+                await self._checkin(conn)
+                return result
+
+    async def send_message(self, message: EmailMessage):
+        """Send an EmailMessage over a pooled session"""
+        return await self._run(lambda smtp: smtp.send_message(message))
+
+    async def sendmail(self, sender: str, recipients: Sequence[str], data: bytes):
+        """Send an already-serialized message over a pooled session"""
+        return await self._run(lambda smtp: smtp.sendmail(sender, recipients, data))
+
+    async def aclose(self):
+        """QUIT every idle session"""
+        while self.idle:
+            await self._quit(self.idle.pop())
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self.idle),
+            "in_use": self.created - self.recycled - self.discarded - len(self.idle),
+            "created": self.created,
+            "recycled": self.recycled,
+            "discarded": self.discarded,
+        }
@@ -0,0 +1,119 @@
+"""
+Queue Worker - runs the RabbitMQ consumers without the HTTP API
+
+Boots only the settings, the providers and EventHandler_Service (no FastAPI app, middleware or
+instrumentator), so consumers are scaled and restarted independently of the API replicas:
+
+    python -m src.worker --processes 4
+
+Set QUEUE_CONSUMERS_IN_API=false on the API once workers do the consuming.
+"""
+import argparse, multiprocessing, signal, time
+from multiprocessing.connection import wait
+from prometheus_client import start_http_server
+from src.services.notification_runtime import start_services, start_consumers, start_broadcasts, stop_services
+from src.core import settings, asyncio, logging, init_db
+from src.core.dbconfig import engine
+from src.services import EventHandler_Service
+
+
+async def serve(index: int = 0):
+    """Consume until SIGTERM/SIGINT, then drain in-flight messages and close the providers"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    eventrouter_handler = EventHandler_Service()
+    await eventrouter_handler.connect_rabbitmq()
+    await start_services()
+    await start_consumers(eventrouter_handler)
+    await start_broadcasts(eventrouter_handler)
+    if settings.worker_metrics_port:
+        start_http_server(settings.worker_metrics_port + index)
+    logging.info(f"✅ Queue worker {index} consuming")
+
+    await stop.wait()
+    logging.info(f"Queue worker {index} shutting down")
+
+    await stop_services(eventrouter_handler)
+    await engine.dispose()
+
+
+def work(index: int):
+    asyncio.run(serve(index))
+
+
+async def prepare():
+    """Create the tables once, rather than from every worker process at the same time"""
+    await init_db()
+    await engine.dispose()
+
+
+def run(processes: int):
+    """Start `processes` workers and restart any that die, until SIGTERM/SIGINT"""
+    asyncio.run(prepare())
+    if processes <= 1:
+        return work(0)
+
+    # spawn, not fork: every worker gets its own event loop, connections and pools
+    context = multiprocessing.get_context("spawn")
+
+    def start(index: int):
+        process = context.Process(target=work, args=(index,), name=f"queue-worker-{index}")
+        process.start()
+        return process
+
+    workers = {index: start(index) for index in range(processes)}
+    started_at = {index: time.monotonic() for index in workers}
+    deaths = {index: 0 for index in workers}  # consecutive early deaths per worker, for its backoff
+    restart_at = {}  # {index: monotonic time a dead worker is due to be restarted}
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in workers.values():
+            if process.is_alive():
+                process.terminate()  # SIGTERM: the worker drains and exits
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    while workers or restart_at:
+        # Wake for a worker dying or for the next restart falling due, whichever comes first
+        timeout = max(min(restart_at.values()) - time.monotonic(), 0) if restart_at else None
+        wait([process.sentinel for process in workers.values()], timeout=timeout)
+        now = time.monotonic()
+
+        for index, process in list(workers.items()):
+            if process.is_alive():
+                continue
+            del workers[index]
+            if stopping:
+                continue
+            if now - started_at[index] >= settings.worker_restart_backoff_max:
+                deaths[index] = 0  # it had been healthy: start its backoff over
+            delay = min(settings.worker_restart_backoff * 2 ** deaths[index], settings.worker_restart_backoff_max)
+            deaths[index] += 1
+            restart_at[index] = now + delay
+            logging.error(f"Queue worker {index} exited with code {process.exitcode}, restarting in {delay:.1f}s")
+
+        if stopping:
+            restart_at.clear()
+            continue
+        for index, due in list(restart_at.items()):
+            if due <= now:
+                del restart_at[index]
+                workers[index] = start(index)
+                started_at[index] = time.monotonic()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the notification queue consumers")
+    parser.add_argument("--processes", "-p", type=int, default=settings.worker_processes, help="consumer processes (WORKER_PROCESSES)")
+    args = parser.parse_args()
+    run(args.processes)
+
+
+if __name__ == "__main__":
+    main()